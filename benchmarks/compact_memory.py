@@ -0,0 +1,68 @@
+import argparse
+import gc
+import multiprocessing
+import os
+
+import cq_centrifugal_fan.use_cases.default as cf_default
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+MODES = {
+    "parts": lambda fb: fb.build_parts(),
+    "compact parts": lambda fb: {
+        key: getattr(fb, key).build_compact() for key in fb.PARTS
+    },
+    "scene": lambda fb: fb.build(),
+    "compact scene": lambda fb: fb.build_compact(),
+}
+
+
+def retain(mode, count, queue):
+    fan_builder = cf_default.make_fan_builder()
+    build = MODES[mode]
+    # warm up caches and imports so they are not counted
+    build(fan_builder)
+
+    gc.collect()
+    rss = rss_bytes()
+    objects = len(gc.get_objects())
+
+    kept = [build(fan_builder) for _ in range(count)]
+
+    gc.collect()
+    queue.put((rss_bytes() - rss, len(gc.get_objects()) - objects))
+
+
+def measure(mode, count):
+    # a fresh process per mode, RSS does not shrink after a run
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=retain, args=(mode, count, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory retained per built fan, Workplane against compact"
+    )
+    parser.add_argument("--count", type=int, default=10)
+    args = parser.parse_args()
+
+    for mode in MODES:
+        rss, objects = measure(mode, args.count)
+        print(
+            f"{mode:>13}: {rss / args.count / 1024:8.0f} KiB"
+            f" {objects / args.count:8.0f} python objects per fan"
+        )
+
+
+if __name__ == "__main__":
+    main()
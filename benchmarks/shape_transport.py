@@ -0,0 +1,79 @@
+import argparse
+import concurrent.futures as cf
+import time
+
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.transport as cf_transport
+import cq_centrifugal_fan.use_cases.default as cf_default
+
+# built once per worker, the benchmark measures moving it, not building it
+_built = None
+
+
+def _init_worker():
+    global _built
+    _built = cf_default.make_fan_builder().cent_b.build()
+
+
+def send_workplane(_):
+    return _built
+
+
+def send_brep(_):
+    return cf_export.brep_bytes(_built)
+
+
+def send_handle(_):
+    return cf_transport.share(_built)
+
+
+def receive_workplane(result):
+    return result.val()
+
+
+def receive_brep(result):
+    return cf_export.from_brep_bytes(result)
+
+
+def receive_handle(result):
+    return result.shape
+
+
+def skip_handle(result):
+    # lazy, the shape is never needed
+    result.release()
+
+
+MODES = {
+    "pickled workplane": (send_workplane, receive_workplane),
+    "pickled brep bytes": (send_brep, receive_brep),
+    "shared memory": (send_handle, receive_handle),
+    "shared memory, unused": (send_handle, skip_handle),
+}
+
+
+def run(executor, send, receive, count):
+    start = time.perf_counter()
+    for result in executor.map(send, range(count)):
+        receive(result)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Shapes per second moved from workers to the parent"
+    )
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with cf.ProcessPoolExecutor(args.workers, initializer=_init_worker) as executor:
+        # warm up every worker
+        list(executor.map(send_brep, range(args.workers * 2)))
+        for mode, (send, receive) in MODES.items():
+            rate = run(executor, send, receive, args.count)
+            print(f"{mode:>22}: {rate:8.1f} shapes/s")
+
+
+if __name__ == "__main__":
+    main()
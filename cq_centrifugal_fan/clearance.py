@@ -0,0 +1,205 @@
+import time
+
+import numpy as np
+from OCP.BRepExtrema import BRepExtrema_DistShapeShape
+from OCP.Extrema import Extrema_ExtFlag_MIN
+
+import cq_centrifugal_fan.errors as cf_errors
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.mesh as cf_mesh
+
+# distances below this count as touching
+TOUCHING = 1e-7
+
+# rotor against hull, motor holder against hull, rotor against motor holder
+FAN_PAIRS = (("cent_b", "fcb"), ("fmh", "fcb"), ("cent_b", "fmh"))
+
+
+class Clearance:
+    def __init__(self, distance, point_a, point_b, interferes, method, elapsed) -> None:
+        self.distance = distance
+        self.point_a = point_a
+        self.point_b = point_b
+        self.interferes = interferes
+        self.method = method
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        state = "interference" if self.interferes else f"{self.distance:.4f}"
+        return f"Clearance({state}, method={self.method}, {self.elapsed:.4f}s)"
+
+    def to_dict(self):
+        return {
+            "distance": self.distance,
+            "point_a": list(self.point_a),
+            "point_b": list(self.point_b),
+            "interferes": self.interferes,
+            "method": self.method,
+            "elapsed": self.elapsed,
+        }
+
+
+def surface_samples(shape, deflection):
+    vertices, triangles = cf_mesh.weld(*cf_mesh.tessellate(shape, deflection))
+    centroids = vertices[triangles].mean(axis=1)
+    return vertices, triangles, np.concatenate([vertices, centroids])
+
+
+def nearest_pair(points_a, points_b, chunk=2048):
+    best = (np.inf, None, None)
+    sq_b = np.einsum("ij,ij->i", points_b, points_b)
+    for start in range(0, len(points_a), chunk):
+        block = points_a[start : start + chunk]
+        sq_a = np.einsum("ij,ij->i", block, block)
+        d2 = sq_a[:, None] + sq_b[None, :] - 2 * block @ points_b.T
+        i, j = np.unravel_index(np.argmin(d2), d2.shape)
+        if d2[i, j] < best[0]:
+            best = (d2[i, j], block[i], points_b[j])
+    d2, a, b = best
+    return float(np.sqrt(max(d2, 0.0))), a, b
+
+
+def points_inside(points, vertices, triangles, chunk=512):
+    # parity of crossings of a ray going up +Z through a closed mesh
+    corners = vertices[triangles]
+    x0, y0, z0 = corners[:, 0].T
+    x1, y1, z1 = corners[:, 1].T
+    x2, y2, z2 = corners[:, 2].T
+    det = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+    usable = np.abs(det) > 1e-12
+    x0, y0, z0, x1, y1, z1, x2, y2, z2, det = (
+        v[usable] for v in (x0, y0, z0, x1, y1, z1, x2, y2, z2, det)
+    )
+
+    inside = np.zeros(len(points), dtype=bool)
+    # NOTE: a tiny skew keeps rays off shared edges and vertices
+    points = points + np.array([1.3e-7, 0.7e-7, 0.0])
+    for start in range(0, len(points), chunk):
+        px = points[start : start + chunk, 0, None]
+        py = points[start : start + chunk, 1, None]
+        pz = points[start : start + chunk, 2, None]
+        l0 = ((y1 - y2) * (px - x2) + (x2 - x1) * (py - y2)) / det
+        l1 = ((y2 - y0) * (px - x2) + (x0 - x2) * (py - y2)) / det
+        l2 = 1 - l0 - l1
+        hit = (l0 >= 0) & (l1 >= 0) & (l2 >= 0)
+        z = l0 * z0 + l1 * z1 + l2 * z2
+        crossings = np.count_nonzero(hit & (z > pz), axis=1)
+        inside[start : start + chunk] = crossings % 2 == 1
+    return inside
+
+
+def interferes(mesh_a, mesh_b, max_samples=4000):
+    # any sample of one part strictly inside the other
+    for (_, _, samples), (other_vertices, other_triangles, _) in (
+        (mesh_a, mesh_b),
+        (mesh_b, mesh_a),
+    ):
+        # only samples within the other part's bounds can be inside it
+        low, high = other_vertices.min(axis=0), other_vertices.max(axis=0)
+        samples = samples[np.all((samples > low) & (samples < high), axis=1)]
+        if len(samples) > max_samples:
+            step = int(np.ceil(len(samples) / max_samples))
+            samples = samples[::step]
+        if points_inside(samples, other_vertices, other_triangles).any():
+            return True
+    return False
+
+
+def bounding_box_gap(shape_a, shape_b):
+    # a lower bound of the distance, 0 when the boxes overlap
+    a, b = shape_a.BoundingBox(), shape_b.BoundingBox()
+    gaps = [
+        max(a.xmin - b.xmax, b.xmin - a.xmax, 0.0),
+        max(a.ymin - b.ymax, b.ymin - a.ymax, 0.0),
+        max(a.zmin - b.zmax, b.zmin - a.zmax, 0.0),
+    ]
+    return float(np.linalg.norm(gaps))
+
+
+def exact_distance(shape_a, shape_b):
+    extrema = BRepExtrema_DistShapeShape(
+        shape_a.wrapped, shape_b.wrapped, Extrema_ExtFlag_MIN
+    )
+    if not extrema.IsDone() or extrema.NbSolution() == 0:
+        return None
+    a = extrema.PointOnShape1(1)
+    b = extrema.PointOnShape2(1)
+    return (
+        extrema.Value(),
+        np.array([a.X(), a.Y(), a.Z()]),
+        np.array([b.X(), b.Y(), b.Z()]),
+        extrema.InnerSolution(),
+    )
+
+
+def clearance(a, b, method="auto", deflection=0.05):
+    if method not in ("auto", "exact", "sampled"):
+        raise cf_errors.ValueError(f"Unknown clearance method {method!r}")
+
+    start = time.perf_counter()
+    shape_a, shape_b = cf_export.to_shape(a), cf_export.to_shape(b)
+    # parts whose boxes are apart cannot overlap, None is not known yet
+    overlap = None if bounding_box_gap(shape_a, shape_b) == 0 else False
+
+    if method != "sampled" and overlap is None:
+        # NOTE: the boolean answers overlap several times faster than extrema,
+        # which then only runs for the distance of parts that are apart
+        try:
+            common = shape_a.intersect(shape_b)
+        except Exception:
+            if method == "exact":
+                raise
+        else:
+            overlap = common.Volume() > TOUCHING
+            if overlap:
+                center = common.BoundingBox().center.toTuple()
+                return Clearance(
+                    0.0, center, center, True, "exact", time.perf_counter() - start
+                )
+
+    result = None
+    if method != "sampled":
+        try:
+            result = exact_distance(shape_a, shape_b)
+        except Exception:
+            if method == "exact":
+                raise
+        if result is None and method == "exact":
+            raise cf_errors.RuntimeError("OCC extrema did not find a solution")
+
+    if result is not None:
+        distance, point_a, point_b, inner = result
+        used = "exact"
+        if overlap is None:
+            overlap = inner
+    else:
+        mesh_a = surface_samples(shape_a, deflection)
+        mesh_b = surface_samples(shape_b, deflection)
+        distance, point_a, point_b = nearest_pair(mesh_a[2], mesh_b[2])
+        used = "sampled"
+        if overlap is None:
+            overlap = interferes(mesh_a, mesh_b)
+
+    if overlap:
+        distance = 0.0
+
+    return Clearance(
+        distance,
+        tuple(float(v) for v in point_a),
+        tuple(float(v) for v in point_b),
+        overlap,
+        used,
+        time.perf_counter() - start,
+    )
+
+
+def fan_clearances(fan_builder, pairs=FAN_PAIRS, **kwargs):
+    scene = fan_builder.build_lazy()
+    placed = {}
+    result = {}
+    for key_a, key_b in pairs:
+        for key in (key_a, key_b):
+            if key not in placed:
+                placed[key] = scene.placed(key)
+        result[(key_a, key_b)] = clearance(placed[key_a], placed[key_b], **kwargs)
+    return result
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class Constraint:
+    # check takes the builder and returns a bool, or a bool array when the
+    # builder was constructed with arrays of parameters
+    def __init__(self, description, check) -> None:
+        self.description = description
+        self.check = check
+
+    def __call__(self, builder):
+        with np.errstate(all="ignore"):
+            return np.asarray(self.check(builder), dtype=bool)
+
+    def __repr__(self) -> str:
+        return f"Constraint({self.description})"
+
+
+class Violation:
+    def __init__(self, builder, constraint, failed) -> None:
+        self.builder = builder
+        self.constraint = constraint
+        self.failed = failed
+
+    def __str__(self) -> str:
+        message = f"{type(self.builder).__name__}: {self.constraint.description}"
+        if self.failed.ndim:
+            message += f" (fails for {self.failed.sum()} of {self.failed.size})"
+        return message
+
+
+def violations(builder, constraints):
+    result = []
+    for constraint in constraints:
+        ok = constraint(builder)
+        if not ok.all():
+            result.append(Violation(builder, constraint, ~ok))
+    return result
+
+
+def feasible(violations):
+    mask = np.ones((), dtype=bool)
+    for violation in violations:
+        mask = mask & ~violation.failed
+    return mask
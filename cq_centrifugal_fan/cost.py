@@ -0,0 +1,186 @@
+import argparse
+import math
+import weakref
+
+import cq_centrifugal_fan.export as cf_export
+
+# g/cm^3
+DENSITIES = {"pla": 1.24, "petg": 1.27, "abs": 1.04, "asa": 1.07}
+
+
+class MassProperties:
+    def __init__(self, volume, area, xlen, ylen, zlen) -> None:
+        self.volume = volume
+        self.area = area
+        self.xlen = xlen
+        self.ylen = ylen
+        self.zlen = zlen
+
+
+# keyed by the built object itself, entries go away with the shape
+_mass_properties = weakref.WeakKeyDictionary()
+
+
+def mass_properties(obj):
+    try:
+        return _mass_properties[obj]
+    except (KeyError, TypeError):
+        pass
+
+    shape = cf_export.to_shape(obj)
+    bb = shape.BoundingBox()
+    props = MassProperties(shape.Volume(), shape.Area(), bb.xlen, bb.ylen, bb.zlen)
+    try:
+        _mass_properties[obj] = props
+    except TypeError:
+        pass
+    return props
+
+
+class PrintModel:
+    def __init__(
+        self,
+        material="pla",
+        filament_diameter=1.75,
+        layer_height=0.2,
+        line_width=0.45,
+        walls=2,
+        infill=0.2,
+        wall_speed=40,
+        infill_speed=80,
+        layer_seconds=1.5,
+        travel_ratio=0.1,
+        price_per_kg=20,
+    ) -> None:
+        self.material = material
+        self.density = DENSITIES[material]
+        self.filament_diameter = filament_diameter
+        self.layer_height = layer_height
+        self.line_width = line_width
+        self.walls = walls
+        self.infill = infill
+        self.wall_speed = wall_speed
+        self.infill_speed = infill_speed
+        self.layer_seconds = layer_seconds
+        self.travel_ratio = travel_ratio
+        self.price_per_kg = price_per_kg
+
+    def flow(self, speed):
+        # mm^3 of plastic laid down per second
+        return speed * self.line_width * self.layer_height
+
+    def layers(self, height):
+        return math.ceil(height / self.layer_height)
+
+    def split(self, props):
+        # every surface gets the same shell, whatever its orientation
+        shell = min(props.volume, props.area * self.walls * self.line_width)
+        infill = (props.volume - shell) * self.infill
+        return shell, infill
+
+
+class Estimate:
+    def __init__(self, name, model, shell, infill, height, extrusion_seconds):
+        self.name = name
+        self.shell = shell
+        self.infill = infill
+        self.volume = shell + infill
+        self.mass = self.volume / 1000 * model.density
+        self.filament_length = self.volume / (
+            math.pi * (model.filament_diameter / 2) ** 2
+        )
+        self.layers = model.layers(height)
+        self.seconds = extrusion_seconds + self.layers * model.layer_seconds
+        self.cost = self.mass / 1000 * model.price_per_kg
+
+    def __repr__(self) -> str:
+        return (
+            f"Estimate({self.name}, {self.mass:.1f}g, "
+            f"{self.seconds / 60:.0f}min, {self.filament_length / 1000:.2f}m)"
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "mass_g": self.mass,
+            "filament_mm": self.filament_length,
+            "seconds": self.seconds,
+            "layers": self.layers,
+            "cost": self.cost,
+        }
+
+
+def extrusion_seconds(model, shell, infill):
+    seconds = shell / model.flow(model.wall_speed)
+    seconds += infill / model.flow(model.infill_speed)
+    return seconds * (1 + model.travel_ratio)
+
+
+def estimate_part(obj, model=None, name=None):
+    if model is None:
+        model = PrintModel()
+    if name is None:
+        name = getattr(obj, "name", None) or "part"
+
+    props = mass_properties(obj)
+    shell, infill = model.split(props)
+    return Estimate(
+        name, model, shell, infill, props.zlen, extrusion_seconds(model, shell, infill)
+    )
+
+
+def estimate_plate(parts, model=None):
+    if model is None:
+        model = PrintModel()
+    if not isinstance(parts, dict):
+        parts = cf_export.named_parts(parts)
+
+    estimates = [estimate_part(part, model, name) for name, part in parts.items()]
+
+    # parts on one plate share their layer changes
+    shell = sum(e.shell for e in estimates)
+    infill = sum(e.infill for e in estimates)
+    height = max((mass_properties(part).zlen for part in parts.values()), default=0)
+    plate = Estimate(
+        "plate",
+        model,
+        shell,
+        infill,
+        height,
+        sum(extrusion_seconds(model, e.shell, e.infill) for e in estimates),
+    )
+    return plate, estimates
+
+
+def parts_for_print(fan_builder):
+    # exactly what goes on the plate, the motor holder is not printed
+    return cf_export.named_parts(fan_builder.build_for_print()[1])
+
+
+def main():
+    import cq_centrifugal_fan.use_cases.default as cf_default
+
+    parser = argparse.ArgumentParser(
+        description="Estimate filament and print time of the default fan"
+    )
+    parser.add_argument("--material", default="pla", choices=sorted(DENSITIES))
+    parser.add_argument("--infill", type=float, default=0.2)
+    parser.add_argument("--walls", type=int, default=2)
+    parser.add_argument("--layer-height", type=float, default=0.2)
+    args = parser.parse_args()
+
+    model = PrintModel(
+        material=args.material,
+        infill=args.infill,
+        walls=args.walls,
+        layer_height=args.layer_height,
+    )
+    plate, estimates = estimate_plate(
+        parts_for_print(cf_default.make_fan_builder()), model
+    )
+    for estimate in estimates + [plate]:
+        print(estimate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import math
+
+import cadquery as cq
+
+import cq_centrifugal_fan.export as cf_export
+
+
+def label_text(parameter, value):
+    return f"{value:g}"
+
+
+def build_tab(blank, depth, height):
+    bb = blank.BoundingBox()
+    # overlaps the blank a little so the union is a single solid
+    overlap = min(bb.ylen / 4, depth / 2)
+    return (
+        cq.Workplane("XY")
+        .box(bb.xlen, depth + overlap, height, centered=(True, False, False))
+        .translate((bb.center.x, bb.ymin - depth, bb.zmin))
+        .val()
+    )
+
+
+def build_label(text, tab, font_size, height):
+    # raised on the tab as a body of its own, slicers merge it with the tab.
+    # Cutting text into a solid costs more than the rest of a coupon.
+    bb = tab.BoundingBox()
+    return (
+        cq.Workplane("XY")
+        .workplane(offset=bb.zmax)
+        .center(bb.center.x, bb.ymin + font_size * 0.9)
+        # NOTE: clean() on text costs more than building it, nothing to merge
+        .text(text, font_size, height, combine=False, clean=False)
+        .val()
+    )
+
+
+def coupon_batch(
+    builder,
+    parameter,
+    values,
+    spacing=2.0,
+    font_size=2.0,
+    label_height=0.4,
+    tab_height=1.2,
+    label=label_text,
+):
+    values = list(values)
+
+    # invariant geometry, built once for the whole batch
+    blank = cf_export.to_shape(builder.coupon_blank(parameter, values))
+    tab = build_tab(blank, font_size * 1.8, tab_height)
+    blank = blank.fuse(tab).clean()
+
+    bb = blank.BoundingBox()
+    columns = math.ceil(math.sqrt(len(values)))
+    pitch_x = bb.xlen + spacing
+    pitch_y = bb.ylen + spacing
+
+    coupons = []
+    for i, value in enumerate(values):
+        cut = cf_export.to_shape(builder.coupon_cut(parameter, value))
+        text = build_label(label(parameter, value), tab, font_size, label_height)
+        coupon = cq.Compound.makeCompound([blank.cut(cut), text])
+
+        row, column = divmod(i, columns)
+        # a location, translate() would copy every face of the text
+        coupon = coupon.moved(
+            cq.Location(
+                cq.Vector(
+                    column * pitch_x - bb.xmin, -row * pitch_y - bb.ymax, -bb.zmin
+                )
+            )
+        )
+        coupons.append(cq.Workplane("XY").add(coupon))
+
+    plate = cq.Workplane("XY")
+    for coupon in coupons:
+        plate = plate.add(coupon)
+
+    return plate, coupons
@@ -1,11 +1,23 @@
+import json
+import os
+import struct
 import sys
+import time
 from typing import Any
 import cq_centrifugal_fan.errors as cf_errors
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.mesh as cf_mesh
 
+import cadquery as cq
 import cqkit as ck
+import numpy as np
 
 
 class Monitor:
+    # passthrough monitors see every call, FallbackCompositeMonitor keeps going
+    # after them
+    passthrough = False
+
     def __init__(self) -> None:
         pass
 
@@ -57,10 +69,11 @@ class OcpMonitor(ModuleBasedMonitor):
             raise cf_errors.DependencyError("OcpMonitor requires ocp_vscode", ex)
 
         self.module = ocp_vscode
+        defaults_kwargs = self.defaults_kwargs
         if defaults_kwargs is None:
             defaults_kwargs = {"reset_camera": ocp_vscode.Camera.CENTER}
         ocp_vscode.set_port(self.port)
-        ocp_vscode.set_defaults(**self.defaults_kwargs)
+        ocp_vscode.set_defaults(**defaults_kwargs)
         self.is_initialized = True
 
 
@@ -103,13 +116,142 @@ class FallbackCompositeMonitor(Monitor):
     def show_object(self, *args, **kwargs):
         exceptions = []
         for monitor in self.monitors:
+            if monitor.passthrough:
+                # a side channel such as a recorder never keeps the viewers
+                # from showing the object
+                try:
+                    monitor.show_object(*args, **kwargs)
+                except Exception as ex:
+                    print(
+                        f"{type(monitor).__name__} failed: {type(ex).__name__}: {ex}",
+                        file=sys.stderr,
+                    )
+                continue
             try:
                 return monitor.show_object(*args, **kwargs)
             except cf_errors.DependencyError as ex:
                 exceptions.append(ex)
         raise cf_errors.RuntimeError(
-            "All monitors failed to show object", exceptions=ex
+            "All monitors failed to show object", exceptions=exceptions
+        )
+
+
+RECORD_MAGIC = b"CFR1"
+RECORD_HEADER = struct.Struct("<4sII")
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class RecordingMonitor(Monitor):
+    passthrough = True
+
+    def __init__(self, path, mode="brep", tolerance=0.1) -> None:
+        if mode not in ("brep", "mesh"):
+            raise cf_errors.ValueError(f"Unknown recording mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.tolerance = tolerance
+
+    def encode(self, obj):
+        if obj is None or not isinstance(obj, (cq.Workplane, cq.Shape)):
+            return {"kind": "none"}, b""
+        if self.mode == "brep":
+            return {"kind": "brep"}, cf_export.brep_bytes(obj)
+
+        vertices, triangles = cf_mesh.weld(*cf_mesh.tessellate(obj, self.tolerance))
+        header = {
+            "kind": "mesh",
+            "vertices": len(vertices),
+            "triangles": len(triangles),
+        }
+        payload = vertices.astype("<f4").tobytes() + triangles.astype("<u4").tobytes()
+        return header, payload
+
+    def show_object(self, obj=None, *args, **kwargs):
+        try:
+            header, payload = self.encode(obj)
+        except Exception as ex:
+            # e.g. an empty Workplane, the call is still recorded
+            header, payload = {"kind": "none", "error": str(ex)}, b""
+        header["time"] = time.time()
+        # not everything a viewer takes survives JSON, say what was left out.
+        # Positional args keep their place as None.
+        header["args"] = [arg if _jsonable(arg) else None for arg in args]
+        header["dropped_args"] = [i for i, arg in enumerate(args) if not _jsonable(arg)]
+        header["kwargs"] = {k: v for k, v in kwargs.items() if _jsonable(v)}
+        header["dropped"] = [k for k, v in kwargs.items() if not _jsonable(v)]
+
+        encoded = json.dumps(header).encode()
+        with open(self.path, "ab") as f:
+            f.write(RECORD_HEADER.pack(RECORD_MAGIC, len(encoded), len(payload)))
+            f.write(encoded)
+            f.write(payload)
+
+
+def read_records(path):
+    with open(path, "rb") as f:
+        # records appended while reading, e.g. by a recorder, are not replayed
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            prefix = f.read(RECORD_HEADER.size)
+            if len(prefix) < RECORD_HEADER.size:
+                return
+            magic, header_size, payload_size = RECORD_HEADER.unpack(prefix)
+            if magic != RECORD_MAGIC:
+                raise cf_errors.RuntimeError(f"{path} is not a monitor recording")
+            header = json.loads(f.read(header_size))
+            payload = f.read(payload_size)
+            if len(payload) < payload_size:
+                return  # the recording process died mid-write
+
+            if header["kind"] == "brep":
+                obj = cf_export.from_brep_bytes(payload)
+            elif header["kind"] == "mesh":
+                split = header["vertices"] * 12
+                vertices = np.frombuffer(payload[:split], dtype="<f4").reshape(-1, 3)
+                triangles = np.frombuffer(payload[split:], dtype="<u4").reshape(-1, 3)
+                obj = cf_mesh.to_shape(vertices, triangles)
+            else:
+                obj = None
+            yield obj, header
+
+
+def replay(path, target=None, delay=0.0):
+    if target is None:
+        # the recorder of this session would append to what is being replayed
+        target = FallbackCompositeMonitor(
+            [m for m in monitor.monitors if not m.passthrough]
         )
+    count = 0
+    for obj, header in read_records(path):
+        target.show_object(obj, *header["args"], **header["kwargs"])
+        count += 1
+        if delay:
+            time.sleep(delay)
+    return count
+
+
+monitor = FallbackCompositeMonitor(
+    [OcpMonitor(), JupyterMonitor(), CqKitMonitor(), NoOpMonitor()]
+)
+
+if os.environ.get("CF_RECORD_MONITOR"):
+    monitor.monitors.insert(0, RecordingMonitor(os.environ["CF_RECORD_MONITOR"]))
 
 
-monitor = FallbackCompositeMonitor([OcpMonitor(), JupyterMonitor(), CqKitMonitor(), NoOpMonitor()])
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m cq_centrifugal_fan.debug RECORDING", file=sys.stderr)
+        sys.exit(2)
+    start = time.perf_counter()
+    count = replay(sys.argv[1])
+    print(
+        f"replayed {count} calls in {time.perf_counter() - start:.3f}s",
+        file=sys.stderr,
+    )
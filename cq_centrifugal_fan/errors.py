@@ -1,7 +1,9 @@
 class WrappingException(Exception):
     def __init__(self, message, exceptions=None, *args: object, **kwargs) -> None:
         super().__init__(message, *args, **kwargs)
-        if not isinstance(exceptions, list):
+        if exceptions is None:
+            exceptions = []
+        elif not isinstance(exceptions, list):
             exceptions = [exceptions]
         self.exceptions = exceptions
 
@@ -32,3 +34,17 @@ class RuntimeError(Exception, RuntimeError):
 
 class DependencyError(Exception, NameError):
     pass
+
+
+class ValueError(Exception, ValueError):
+    pass
+
+
+class TimeoutError(Exception, TimeoutError):
+    pass
+
+
+class ConstraintError(ValueError):
+    def __init__(self, message, violations, *args: object, **kwargs) -> None:
+        super().__init__(message, violations, *args, **kwargs)
+        self.violations = self.exceptions
@@ -0,0 +1,112 @@
+import io
+import math
+import os
+import tempfile
+
+import cadquery as cq
+from OCP.BRepTools import BRepTools
+from OCP.TopTools import TopTools_FormatVersion_CURRENT
+
+import cq_centrifugal_fan.errors as cf_errors
+
+FORMATS = {
+    "stl": "model/stl",
+    "step": "model/step",
+    "brep": "application/octet-stream",
+    "glb": "model/gltf-binary",
+}
+
+
+def to_shape(obj):
+    if isinstance(obj, cq.Shape):
+        return obj
+    shapes = [val for val in obj.vals() if isinstance(val, cq.Shape)]
+    if not shapes:
+        raise cf_errors.RuntimeError("Nothing to export, no shapes on the stack")
+    if len(shapes) == 1:
+        return shapes[0]
+    return cq.Compound.makeCompound(shapes)
+
+
+def named_parts(parts):
+    # {name: part} for a list of parts, repeated names get a _1, _2 suffix
+    result = {}
+    for i, part in enumerate(parts):
+        base = getattr(part, "name", None) or f"part{i}"
+        name, n = base, 0
+        while name in result:
+            n += 1
+            name = f"{base}_{n}"
+        result[name] = part
+    return result
+
+
+def brep_bytes(obj):
+    # geometry only, a triangulation left on the shape by a viewer or an
+    # export would make the size depend on what happened to it before
+    stream = io.BytesIO()
+    BRepTools.Write_s(
+        to_shape(obj).wrapped, stream, False, False, TopTools_FormatVersion_CURRENT
+    )
+    return stream.getvalue()
+
+
+def from_brep_bytes(data):
+    return cq.Shape.importBrep(io.BytesIO(data))
+
+
+def export_bytes(obj, fmt, tolerance=0.01, angular_tolerance=0.1):
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise cf_errors.NotImplementedError(f"Unsupported export format: {fmt}")
+    # NOTE: OCC meshes forever with a NaN tolerance
+    if not math.isfinite(tolerance) or tolerance <= 0:
+        raise cf_errors.ValueError(f"Invalid export tolerance: {tolerance}")
+
+    if fmt == "brep":
+        return brep_bytes(obj)
+    if fmt == "glb":
+        # gltf meshes through cf_mesh, which imports this module
+        import cq_centrifugal_fan.gltf as cf_gltf
+
+        return cf_gltf.glb_bytes(obj, tolerance, angular_tolerance)
+
+    shape = to_shape(obj)
+    fd, path = tempfile.mkstemp(suffix="." + fmt)
+    os.close(fd)
+    try:
+        if fmt == "stl":
+            shape.exportStl(path, tolerance, angular_tolerance)
+        else:
+            shape.exportStep(path)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+ASSEMBLY_FORMATS = {
+    ".step": "STEP",
+    ".stp": "STEP",
+    ".gltf": "GLTF",
+    ".glb": "GLTF",
+    ".xml": "XML",
+    ".vrml": "VRML",
+}
+
+
+def export_assembly(assy, path, tolerance=0.01, angular_tolerance=0.1):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ASSEMBLY_FORMATS:
+        raise cf_errors.NotImplementedError(f"Unsupported assembly format: {ext}")
+
+    # NOTE: cadquery writes a shape referenced several times only once, with
+    # one placement per reference, in recent versions
+    save = assy.export if hasattr(assy, "export") else assy.save
+    save(
+        path,
+        ASSEMBLY_FORMATS[ext],
+        tolerance=tolerance,
+        angularTolerance=angular_tolerance,
+    )
+    return path
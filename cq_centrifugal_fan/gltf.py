@@ -0,0 +1,207 @@
+import json
+import struct
+
+import numpy as np
+
+import cadquery as cq
+
+import cq_centrifugal_fan.errors as cf_errors
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.mesh as cf_mesh
+
+GLB_MAGIC = 0x46546C67
+JSON_CHUNK = 0x4E4F534A
+BIN_CHUNK = 0x004E4942
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_INT = 5125
+
+# millimeters, Z up to the meters, Y up of glTF
+Z_UP_MM = [0.001, 0, 0, 0, 0, 0, -0.001, 0, 0, 0.001, 0, 0, 0, 0, 0, 1]
+
+
+def mesh_arrays(obj, tolerance=0.05, angular_tolerance=0.2):
+    vertices, triangles = cf_mesh.tessellate(obj, tolerance, angular_tolerance)
+
+    # vertices are per face here, averaging over them keeps the edges sharp
+    corners = vertices[triangles]
+    face_normals = np.cross(
+        corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    )
+    normals = np.zeros_like(vertices)
+    for i in range(3):
+        np.add.at(normals, triangles[:, i], face_normals)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+    # one vertex per distinct position and normal
+    keys = np.round(np.hstack([vertices, normals]), 6)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    triangles = inverse.reshape(-1)[triangles]
+    return (
+        vertices[first].astype("<f4"),
+        normals[first].astype("<f4"),
+        triangles.astype("<u4").reshape(-1),
+    )
+
+
+def location_matrix(loc):
+    trsf = loc.wrapped.Transformation()
+    rows = [[trsf.Value(i, j) for j in range(1, 5)] for i in range(1, 4)]
+    rows.append([0, 0, 0, 1])
+    # column major
+    return [rows[i][j] for j in range(4) for i in range(4)]
+
+
+class GlbWriter:
+    def __init__(self, tolerance=0.05, angular_tolerance=0.2) -> None:
+        self.tolerance = tolerance
+        self.angular_tolerance = angular_tolerance
+        self.chunks = []
+        self.size = 0
+        self.buffer_views = []
+        self.accessors = []
+        self.meshes = []
+        self.nodes = []
+        # id of the source object to its mesh, shared objects are meshed once
+        self.mesh_ids = {}
+        self.sources = []
+
+    def add_view(self, array, target):
+        data = array.tobytes()
+        self.buffer_views.append(
+            {
+                "buffer": 0,
+                "byteOffset": self.size,
+                "byteLength": len(data),
+                "target": target,
+            }
+        )
+        padding = -len(data) % 4
+        self.chunks.append(data + b"\0" * padding)
+        self.size += len(data) + padding
+        return len(self.buffer_views) - 1
+
+    def add_accessor(self, array, target, component, kind, bounds=False):
+        accessor = {
+            "bufferView": self.add_view(array, target),
+            "componentType": component,
+            "count": len(array),
+            "type": kind,
+        }
+        if bounds:
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+    def add_mesh(self, obj, name):
+        key = id(obj)
+        if key in self.mesh_ids:
+            return self.mesh_ids[key]
+
+        positions, normals, indices = mesh_arrays(
+            obj, self.tolerance, self.angular_tolerance
+        )
+        if not len(indices):
+            self.mesh_ids[key] = None
+            return None
+
+        primitive = {
+            "attributes": {
+                "POSITION": self.add_accessor(
+                    positions, ARRAY_BUFFER, FLOAT, "VEC3", bounds=True
+                ),
+                "NORMAL": self.add_accessor(normals, ARRAY_BUFFER, FLOAT, "VEC3"),
+            },
+            "indices": self.add_accessor(
+                indices, ELEMENT_ARRAY_BUFFER, UNSIGNED_INT, "SCALAR"
+            ),
+            "material": 0,
+        }
+        name = getattr(obj, "name", None) or name
+        self.meshes.append({"name": name, "primitives": [primitive]})
+        self.sources.append(obj)
+        self.mesh_ids[key] = len(self.meshes) - 1
+        return self.mesh_ids[key]
+
+    def add_node(self, name, obj=None, matrix=None, children=()):
+        node = {"name": name}
+        if obj is not None:
+            mesh = self.add_mesh(obj, name)
+            if mesh is not None:
+                node["mesh"] = mesh
+        if matrix is not None:
+            node["matrix"] = matrix
+        if children:
+            node["children"] = list(children)
+        self.nodes.append(node)
+        return len(self.nodes) - 1
+
+    def add_assembly(self, assy):
+        children = [self.add_assembly(child) for child in assy.children]
+        return self.add_node(assy.name, assy.obj, location_matrix(assy.loc), children)
+
+    def add(self, name, obj):
+        if isinstance(obj, cq.Assembly):
+            return self.add_assembly(obj)
+        return self.add_node(name, obj)
+
+    def to_bytes(self, roots, root_matrix=Z_UP_MM):
+        scene_root = self.add_node("root", matrix=root_matrix, children=roots)
+        document = {
+            "asset": {"version": "2.0", "generator": "cq_centrifugal_fan"},
+            "scene": 0,
+            "scenes": [{"nodes": [scene_root]}],
+            "nodes": self.nodes,
+            "meshes": self.meshes,
+            "materials": [
+                {
+                    "pbrMetallicRoughness": {
+                        "baseColorFactor": [0.8, 0.8, 0.8, 1.0],
+                        "metallicFactor": 0.0,
+                        "roughnessFactor": 0.6,
+                    }
+                }
+            ],
+            "accessors": self.accessors,
+            "bufferViews": self.buffer_views,
+            "buffers": [{"byteLength": self.size}],
+        }
+
+        text = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        text += b" " * (-len(text) % 4)
+        binary = b"".join(self.chunks)
+        length = 12 + 8 + len(text) + 8 + len(binary)
+        return b"".join(
+            [
+                struct.pack("<III", GLB_MAGIC, 2, length),
+                struct.pack("<II", len(text), JSON_CHUNK),
+                text,
+                struct.pack("<II", len(binary), BIN_CHUNK),
+                binary,
+            ]
+        )
+
+
+def glb_bytes(parts, tolerance=0.05, angular_tolerance=0.2, root_matrix=Z_UP_MM):
+    # parts is an assembly, a {name: part} dict, a list of parts or one part
+    if isinstance(parts, (cq.Assembly, cq.Workplane, cq.Shape)):
+        parts = [parts]
+    if not isinstance(parts, dict):
+        parts = cf_export.named_parts(parts)
+    if not parts:
+        raise cf_errors.RuntimeError("Nothing to export, no parts given")
+
+    writer = GlbWriter(tolerance, angular_tolerance)
+    roots = [writer.add(name, part) for name, part in parts.items()]
+    return writer.to_bytes(roots, root_matrix)
+
+
+def export_glb(parts, path, tolerance=0.05, angular_tolerance=0.2):
+    data = glb_bytes(parts, tolerance, angular_tolerance)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
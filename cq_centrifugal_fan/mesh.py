@@ -0,0 +1,184 @@
+import json
+import os
+
+import numpy as np
+
+import cadquery as cq
+from OCP.BRep import BRep_Builder, BRep_Tool
+from OCP.BRepBuilderAPI import BRepBuilderAPI_Copy
+from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.BRepTools import BRepTools
+from OCP.gp import gp_Pnt
+from OCP.Poly import Poly_Triangle, Poly_Triangulation
+from OCP.TopAbs import TopAbs_REVERSED
+from OCP.TopLoc import TopLoc_Location
+from OCP.TopoDS import TopoDS_Face
+
+import cq_centrifugal_fan.errors as cf_errors
+import cq_centrifugal_fan.export as cf_export
+
+
+def tessellate(obj, tolerance, angular_tolerance=0.1, remesh=False):
+    shape = cf_export.to_shape(obj)
+    if remesh or not BRepTools.Triangulation_s(shape.wrapped, tolerance):
+        # NOTE: meshes a copy without triangulation, the caller's shape is
+        # left as it was. The copy shares the geometry, it is cheap.
+        shape = cq.Shape.cast(BRepBuilderAPI_Copy(shape.wrapped, False, False).Shape())
+        BRepMesh_IncrementalMesh(
+            shape.wrapped, tolerance, False, angular_tolerance, True
+        )
+
+    vertices = []
+    triangles = []
+    offset = 0
+    for face in shape.Faces():
+        loc = TopLoc_Location()
+        poly = BRep_Tool.Triangulation_s(face.wrapped, loc)
+        if poly is None:
+            continue
+
+        nodes = np.array(
+            [poly.Node(i).Coord() for i in range(1, poly.NbNodes() + 1)],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+        if not loc.IsIdentity():
+            trsf = loc.Transformation()
+            matrix = np.array(
+                [[trsf.Value(i, j) for j in range(1, 5)] for i in range(1, 4)]
+            )
+            nodes = nodes @ matrix[:, :3].T + matrix[:, 3]
+        tris = np.array(
+            [tri.Get() for tri in poly.Triangles()], dtype=np.int64
+        ).reshape(-1, 3)
+        tris = tris - 1 + offset
+        if face.wrapped.Orientation() == TopAbs_REVERSED:
+            tris = tris[:, [0, 2, 1]]
+
+        vertices.append(nodes)
+        triangles.append(tris)
+        offset += len(nodes)
+
+    if not vertices:
+        return np.zeros((0, 3), dtype=np.float64), np.zeros((0, 3), dtype=np.int64)
+    return np.concatenate(vertices), np.concatenate(triangles)
+
+
+# (name, deflection as a fraction of the bounding box diagonal, angular deflection)
+MIN_DEFLECTION = 1e-4
+
+LEVELS = (
+    ("fine", 1 / 2000, 0.1),
+    ("medium", 1 / 400, 0.3),
+    ("coarse", 1 / 80, 0.8),
+)
+
+
+def weld(vertices, triangles, decimals=6):
+    # merge the duplicated boundary vertices that per-face tessellation leaves
+    keys = np.round(vertices, decimals)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    triangles = inverse.reshape(-1)[triangles]
+    degenerate = (
+        (triangles[:, 0] == triangles[:, 1])
+        | (triangles[:, 1] == triangles[:, 2])
+        | (triangles[:, 0] == triangles[:, 2])
+    )
+    return unique, triangles[~degenerate]
+
+
+def lods(obj, levels=LEVELS):
+    shape = cf_export.to_shape(obj)
+    diagonal = shape.BoundingBox().DiagonalLength
+
+    result = []
+    for name, ratio, angular_tolerance in levels:
+        deflection = max(diagonal * ratio, MIN_DEFLECTION)
+        vertices, triangles = tessellate(
+            shape, deflection, angular_tolerance, remesh=True
+        )
+        vertices, triangles = weld(vertices, triangles)
+        result.append((name, deflection, vertices, triangles))
+    return result
+
+
+def write_ply(path, vertices, triangles):
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {len(triangles)}\n"
+        "property list uchar uint vertex_indices\n"
+        "end_header\n"
+    )
+    faces = np.empty(len(triangles), dtype=[("count", "u1"), ("indices", "<u4", (3,))])
+    faces["count"] = 3
+    faces["indices"] = triangles
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        f.write(np.asarray(vertices, dtype="<f4").tobytes())
+        f.write(faces.tobytes())
+
+
+def write_stl(path, vertices, triangles):
+    corners = np.asarray(vertices, dtype=np.float64)[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+    records = np.zeros(
+        len(triangles),
+        dtype=[("normal", "<f4", (3,)), ("corners", "<f4", (3, 3)), ("attr", "<u2")],
+    )
+    records["normal"] = normals
+    records["corners"] = corners
+    with open(path, "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(np.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+
+
+WRITERS = {"ply": write_ply, "stl": write_stl}
+
+
+def export_lods(parts, directory, levels=LEVELS, fmt="ply"):
+    if fmt not in WRITERS:
+        raise cf_errors.NotImplementedError(f"Unsupported LOD format: {fmt}")
+    if not isinstance(parts, dict):
+        parts = cf_export.named_parts(parts)
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for part_name, part in parts.items():
+        for level, deflection, vertices, triangles in lods(part, levels):
+            path = os.path.join(directory, f"{part_name}.{level}.{fmt}")
+            WRITERS[fmt](path, vertices, triangles)
+            manifest.append(
+                {
+                    "part": part_name,
+                    "level": level,
+                    "deflection": deflection,
+                    "vertices": len(vertices),
+                    "triangles": len(triangles),
+                    "path": os.path.basename(path),
+                }
+            )
+
+    with open(os.path.join(directory, "lods.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def to_shape(vertices, triangles):
+    # a face that carries only the triangulation, enough for viewers and STL
+    triangulation = Poly_Triangulation(len(vertices), len(triangles), False)
+    for i, (x, y, z) in enumerate(np.asarray(vertices, dtype=np.float64), 1):
+        triangulation.SetNode(i, gp_Pnt(float(x), float(y), float(z)))
+    for i, (a, b, c) in enumerate(np.asarray(triangles, dtype=np.int64) + 1, 1):
+        triangulation.SetTriangle(i, Poly_Triangle(int(a), int(b), int(c)))
+
+    face = TopoDS_Face()
+    BRep_Builder().MakeFace(face, triangulation)
+    return cq.Shape.cast(face)
@@ -0,0 +1,124 @@
+import argparse
+import collections
+import json
+import sys
+import time
+
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.mesh as cf_mesh
+
+COUNT_KEYS = ("solids", "faces", "edges", "vertices", "triangles", "brep_bytes")
+
+
+def shape_metrics(obj, tolerance=0.1, angular_tolerance=0.1):
+    shape = cf_export.to_shape(obj)
+
+    brep_size = len(cf_export.brep_bytes(shape))
+    # a fresh mesh, not whatever triangulation a viewer left on the shape
+    vertices, triangles = cf_mesh.tessellate(
+        shape, tolerance, angular_tolerance, remesh=True
+    )
+
+    faces = shape.Faces()
+    edges = shape.Edges()
+    return {
+        "solids": len(shape.Solids()),
+        "faces": len(faces),
+        "edges": len(edges),
+        "vertices": len(shape.Vertices()),
+        "surface_types": dict(collections.Counter(f.geomType() for f in faces)),
+        "curve_types": dict(collections.Counter(e.geomType() for e in edges)),
+        "tolerance": tolerance,
+        "angular_tolerance": angular_tolerance,
+        "triangles": len(triangles),
+        "mesh_vertices": len(vertices),
+        "brep_bytes": brep_size,
+    }
+
+
+class MetricsRegistry:
+    def __init__(self, records=None) -> None:
+        self.records = list(records or [])
+
+    def record(self, name, metrics, build_seconds=None):
+        entry = {"name": name, "time": time.time(), "metrics": metrics}
+        if build_seconds is not None:
+            entry["build_seconds"] = build_seconds
+        self.records.append(entry)
+        return entry
+
+    def latest(self):
+        latest = {}
+        for entry in self.records:
+            latest[entry["name"]] = entry["metrics"]
+        return latest
+
+    def clear(self):
+        self.records = []
+
+    def to_json(self, indent=2):
+        return json.dumps({"records": self.records}, indent=indent)
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)["records"])
+
+    def compare(self, baseline, ratio=1.5, keys=COUNT_KEYS):
+        regressions = []
+        old = baseline.latest()
+        for name, metrics in self.latest().items():
+            if name not in old:
+                continue
+            for key in keys:
+                before, after = old[name].get(key), metrics.get(key)
+                if not before or after is None:
+                    continue
+                if after / before >= ratio:
+                    regressions.append(
+                        {"name": name, "metric": key, "before": before, "after": after}
+                    )
+        return regressions
+
+
+registry = MetricsRegistry()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Collect topology metrics for the default fan"
+    )
+    parser.add_argument("--out", default=None, help="write metrics JSON here")
+    parser.add_argument("--baseline", default=None, help="metrics JSON to compare")
+    parser.add_argument("--ratio", type=float, default=1.5)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    from cq_centrifugal_fan.use_cases.default import make_fan_builder
+
+    # NOTE: not the module level registry, under -m this module is __main__
+    run = MetricsRegistry()
+    make_fan_builder().build_with_metrics(tolerance=args.tolerance, registry=run)
+
+    if args.out:
+        run.dump(args.out)
+    else:
+        print(run.to_json())
+
+    if args.baseline:
+        regressions = run.compare(MetricsRegistry.load(args.baseline), args.ratio)
+        for regression in regressions:
+            print(
+                "{name}: {metric} went from {before} to {after}".format(**regression),
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
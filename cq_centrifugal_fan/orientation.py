@@ -0,0 +1,212 @@
+import math
+import time
+
+import numpy as np
+
+import cadquery as cq
+
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.mesh as cf_mesh
+
+DOWN = np.array([0.0, 0.0, -1.0])
+
+
+class OrientationModel:
+    # weights turn every term into mm^3 of printed plastic, roughly
+    def __init__(
+        self,
+        overhang_angle=45,
+        support=1.0,
+        overhang=0.0,
+        contact=1.0,
+        height=10.0,
+        min_contact=1.0,
+        bed_tolerance=0.05,
+    ) -> None:
+        self.overhang_angle = overhang_angle
+        self.support = support
+        self.overhang = overhang
+        self.contact = contact
+        self.height = height
+        self.min_contact = min_contact
+        self.bed_tolerance = bed_tolerance
+
+
+class Orientation:
+    def __init__(
+        self,
+        down,
+        score,
+        overhang_area,
+        support_volume,
+        contact_area,
+        height,
+        zmin,
+        candidates,
+        elapsed,
+    ) -> None:
+        # the direction of the part that ends up pointing at the bed
+        self.down = down
+        self.score = score
+        self.overhang_area = overhang_area
+        self.support_volume = support_volume
+        self.contact_area = contact_area
+        self.height = height
+        # lowest point once rotated, from the mesh so the bed contact is exact
+        self.zmin = zmin
+        self.candidates = candidates
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        down = ", ".join(f"{v:.3f}" for v in self.down)
+        return (
+            f"Orientation(down=({down}), support={self.support_volume:.1f}, "
+            f"contact={self.contact_area:.1f}, height={self.height:.2f}, "
+            f"{self.candidates} candidates in {self.elapsed:.3f}s)"
+        )
+
+    def to_dict(self):
+        return {
+            "down": [float(v) for v in self.down],
+            "score": float(self.score),
+            "overhang_area": float(self.overhang_area),
+            "support_volume": float(self.support_volume),
+            "contact_area": float(self.contact_area),
+            "height": float(self.height),
+            "zmin": float(self.zmin),
+            "candidates": self.candidates,
+            "elapsed": self.elapsed,
+        }
+
+
+def fibonacci_directions(count):
+    i = np.arange(count) + 0.5
+    z = 1 - 2 * i / count
+    r = np.sqrt(1 - z * z)
+    phi = math.pi * (1 + math.sqrt(5)) * i
+    return np.stack([r * np.cos(phi), r * np.sin(phi), z], axis=1)
+
+
+def candidate_directions(normals, areas, count=256, face_count=64):
+    axes = np.vstack([np.eye(3), -np.eye(3)])
+
+    # lying on one of the large flat faces is usually what a slicer user picks
+    keys, inverse = np.unique(np.round(normals, 3), axis=0, return_inverse=True)
+    totals = np.bincount(inverse.reshape(-1), weights=areas)
+    faces = keys[np.argsort(totals)[::-1][:face_count]]
+    faces = faces / np.linalg.norm(faces, axis=1, keepdims=True)
+
+    return np.vstack([axes, faces, fibonacci_directions(count)])
+
+
+def score_directions(vertices, triangles, directions, model=None):
+    if model is None:
+        model = OrientationModel()
+
+    corners = vertices[triangles]
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(cross, axis=1) / 2
+    normals = cross / np.maximum(2 * areas, 1e-300)[:, None]
+    centroids = corners.mean(axis=1)
+
+    # z after rotating each direction onto -Z, one column per candidate
+    nz = -normals @ directions.T
+    z = -vertices @ directions.T
+    zmin = z.min(axis=0)
+    height = z.max(axis=0) - zmin
+    above = -centroids @ directions.T - zmin
+
+    on_bed = (nz < -math.cos(math.radians(1))) & (above < model.bed_tolerance)
+    overhangs = (nz < -math.cos(math.radians(model.overhang_angle))) & ~on_bed
+
+    contact_area = areas @ on_bed
+    overhang_area = areas @ overhangs
+    support_volume = (areas[:, None] * -nz * above * overhangs).sum(axis=0)
+
+    score = (
+        model.support * support_volume
+        + model.overhang * overhang_area
+        + model.height * height
+        - model.contact * contact_area
+    )
+    # balancing on an edge or a point is not an option
+    score = np.where(contact_area >= model.min_contact, score, np.inf)
+
+    return {
+        "score": score,
+        "overhang_area": overhang_area,
+        "support_volume": support_volume,
+        "contact_area": contact_area,
+        "height": height,
+        "zmin": zmin,
+        "areas": areas,
+        "normals": normals,
+    }
+
+
+def best_orientation(obj, model=None, count=256, tolerance=None):
+    start = time.perf_counter()
+    shape = cf_export.to_shape(obj)
+    if tolerance is None:
+        tolerance = max(
+            shape.BoundingBox().DiagonalLength / 200, cf_mesh.MIN_DEFLECTION
+        )
+    vertices, triangles = cf_mesh.tessellate(shape, tolerance, 0.5)
+
+    corners = vertices[triangles]
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(cross, axis=1) / 2
+    keep = areas > 0
+    normals = cross[keep] / (2 * areas[keep, None])
+    directions = candidate_directions(normals, areas[keep], count)
+
+    scores = score_directions(vertices, triangles, directions, model)
+    # without any stable candidate, the least bad one by the other terms
+    best = int(np.argmin(scores["score"]))
+    if not np.isfinite(scores["score"][best]):
+        best = int(np.argmax(scores["contact_area"]))
+
+    return Orientation(
+        directions[best],
+        scores["score"][best],
+        scores["overhang_area"][best],
+        scores["support_volume"][best],
+        scores["contact_area"][best],
+        scores["height"][best],
+        scores["zmin"][best],
+        len(directions),
+        time.perf_counter() - start,
+    )
+
+
+def rotation(down):
+    # axis and angle in degrees that turn `down` onto -Z
+    down = np.asarray(down, dtype=np.float64)
+    down = down / np.linalg.norm(down)
+    axis = np.cross(down, DOWN)
+    angle = math.degrees(math.atan2(np.linalg.norm(axis), down @ DOWN))
+    if np.linalg.norm(axis) < 1e-9:
+        axis = np.array([1.0, 0.0, 0.0])
+    return axis / np.linalg.norm(axis), angle
+
+
+def apply(obj, orientation):
+    shape = cf_export.to_shape(obj)
+    axis, angle = rotation(orientation.down)
+    if angle > 1e-9:
+        shape = shape.rotate((0, 0, 0), tuple(axis), angle)
+
+    # centered on the origin, resting on the bed
+    bb = shape.BoundingBox()
+    shape = shape.translate((-bb.center.x, -bb.center.y, -orientation.zmin))
+
+    result = cq.Workplane("XY").add(shape)
+    name = getattr(obj, "name", None)
+    if name is not None:
+        result.name = name
+    return result
+
+
+def orient(obj, model=None, count=256, tolerance=None):
+    orientation = best_orientation(obj, model, count, tolerance)
+    return apply(obj, orientation), orientation
@@ -0,0 +1,231 @@
+import collections
+import multiprocessing as mp
+import os
+import time
+import traceback
+
+import cadquery as cq
+
+import cq_centrifugal_fan.errors as cf_errors
+import cq_centrifugal_fan.export as cf_export
+
+POLL_INTERVAL = 0.05
+
+
+class Budget:
+    def __init__(self, wall_seconds=60.0, max_rss_bytes=None) -> None:
+        self.wall_seconds = wall_seconds
+        self.max_rss_bytes = max_rss_bytes
+
+    def __repr__(self) -> str:
+        return (
+            f"Budget(wall_seconds={self.wall_seconds}, "
+            f"max_rss_bytes={self.max_rss_bytes})"
+        )
+
+
+DEFAULT_BUDGET = Budget(wall_seconds=60.0, max_rss_bytes=4 * 1024**3)
+
+# Per-builder overrides, keyed by class name. The most derived class wins.
+budgets = {}
+
+
+def budget_for(builder):
+    for cls in type(builder).__mro__:
+        if cls.__name__ in budgets:
+            return budgets[cls.__name__]
+    return DEFAULT_BUDGET
+
+
+class BuildResult:
+    def __init__(
+        self,
+        builder,
+        ok,
+        value=None,
+        reason=None,
+        message=None,
+        elapsed=0.0,
+        peak_rss_bytes=None,
+        source="sandbox",
+    ) -> None:
+        self.builder = builder
+        self.ok = ok
+        self.value = value
+        # one of None, "timeout", "memory", "error", "crashed"
+        self.reason = reason
+        self.message = message
+        self.elapsed = elapsed
+        self.peak_rss_bytes = peak_rss_bytes
+        # "sandbox", "cache" or "preview"
+        self.source = source
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"failed ({self.reason})"
+        return (
+            f"BuildResult({type(self.builder).__name__}, {status}, "
+            f"source={self.source}, elapsed={self.elapsed:.3f}s)"
+        )
+
+    def to_dict(self):
+        return {
+            "builder": type(self.builder).__name__,
+            "ok": self.ok,
+            "reason": self.reason,
+            "message": self.message,
+            "elapsed": self.elapsed,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "source": self.source,
+        }
+
+
+class ResultCache:
+    def __init__(self, max_entries=128) -> None:
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+
+    def key(self, builder, method):
+        return (method, builder.fingerprint())
+
+    def get(self, builder, method):
+        key = self.key(builder, method)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, builder, method, data):
+        self.entries[self.key(builder, method)] = data
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # NOTE: RSS is only enforced where procfs is available
+        return None
+
+
+def _run_child(conn, builder, method):
+    try:
+        built = getattr(builder, method)()
+        if method == "build_for_print":
+            built = built[0]
+        conn.send(("ok", cf_export.brep_bytes(built)))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def _from_brep(data):
+    return cq.Workplane("XY").add(cf_export.from_brep_bytes(data))
+
+
+def guarded_build(
+    builder,
+    method="build",
+    budget=None,
+    cache=None,
+    preview=None,
+    start_method=None,
+):
+    if method not in ("build", "build_for_print"):
+        raise cf_errors.ValueError(f"Cannot run {method!r} in a sandbox")
+    if budget is None:
+        budget = budget_for(builder)
+
+    ctx = mp.get_context(start_method)
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_run_child, args=(child_conn, builder, method), daemon=True
+    )
+
+    start = time.perf_counter()
+    proc.start()
+    child_conn.close()
+
+    payload = None
+    reason = None
+    peak_rss = None
+    while True:
+        if parent_conn.poll(POLL_INTERVAL):
+            try:
+                payload = parent_conn.recv()
+            except EOFError:
+                pass
+            break
+        if not proc.is_alive():
+            break
+
+        rss = _rss_bytes(proc.pid)
+        if rss is not None:
+            peak_rss = max(peak_rss or 0, rss)
+            if budget.max_rss_bytes is not None and rss > budget.max_rss_bytes:
+                reason = "memory"
+                break
+        if (
+            budget.wall_seconds is not None
+            and time.perf_counter() - start > budget.wall_seconds
+        ):
+            reason = "timeout"
+            break
+
+    # the child may have sent its result and exited between poll() and
+    # is_alive(), the pipe still holds it
+    if payload is None and reason is None and parent_conn.poll():
+        try:
+            payload = parent_conn.recv()
+        except EOFError:
+            pass
+
+    if reason is not None:
+        proc.kill()
+    proc.join()
+    parent_conn.close()
+    elapsed = time.perf_counter() - start
+
+    if payload is not None and payload[0] == "ok":
+        if cache is not None:
+            cache.put(builder, method, payload[1])
+        return BuildResult(
+            builder,
+            True,
+            value=_from_brep(payload[1]),
+            elapsed=elapsed,
+            peak_rss_bytes=peak_rss,
+        )
+
+    if reason == "timeout":
+        message = f"Exceeded {budget.wall_seconds}s wall-clock budget"
+    elif reason == "memory":
+        message = f"Exceeded {budget.max_rss_bytes} bytes RSS budget"
+    elif payload is not None:
+        reason, message = "error", payload[1]
+    else:
+        reason = "crashed"
+        message = f"Build process exited with code {proc.exitcode}"
+
+    failure = BuildResult(
+        builder,
+        False,
+        reason=reason,
+        message=message,
+        elapsed=elapsed,
+        peak_rss_bytes=peak_rss,
+    )
+
+    if cache is not None:
+        data = cache.get(builder, method)
+        if data is not None:
+            failure.value = _from_brep(data)
+            failure.source = "cache"
+            return failure
+    if preview is not None:
+        failure.value = preview(builder)
+        failure.source = "preview"
+
+    return failure
@@ -0,0 +1,330 @@
+import argparse
+import collections
+import concurrent.futures as cf
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import http.server
+import importlib
+import json
+import math
+import os
+import re
+import signal
+import sys
+import threading
+import time
+
+import cq_centrifugal_fan.errors as cf_errors
+
+# NOTE: this module is imported by the server process, which never touches
+# cadquery itself. Only the workers pay for importing OCC, and they do it once
+# at startup.
+
+CONTENT_TYPES = {
+    "stl": "model/stl",
+    "step": "model/step",
+    "brep": "application/octet-stream",
+    "glb": "model/gltf-binary",
+}
+
+# mm, finer meshes only take longer
+MIN_TOLERANCE = 1e-3
+
+USE_CASE_PATTERN = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _warm_worker():
+    # the build budget is enforced by SIGALRM killing the worker
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    import cadquery  # noqa: F401
+    import cq_centrifugal_fan.export  # noqa: F401
+    import cq_centrifugal_fan.shapes  # noqa: F401
+
+
+def _ping():
+    return True
+
+
+def _build(request, timeout=None):
+    import cq_centrifugal_fan.export as cf_export
+    import cq_centrifugal_fan.sandbox as cf_sandbox
+
+    timings = {}
+
+    start = time.perf_counter()
+    module_name = "cq_centrifugal_fan.use_cases." + request["use_case"]
+    try:
+        module = importlib.import_module(module_name)
+    except ModuleNotFoundError as ex:
+        if ex.name != module_name:
+            raise
+        raise cf_errors.ValueError(f"Unknown use case: {request['use_case']!r}")
+    try:
+        builder = module.make_fan_builder(**request["params"])
+    except TypeError as ex:
+        raise cf_errors.ValueError(f"Invalid params: {ex}")
+    if request["part"] is not None:
+        # checked here, the server process does not import the builders
+        if request["part"] not in builder.PARTS:
+            raise cf_errors.ValueError(
+                f"Unknown part {request['part']!r}, expected one of {builder.PARTS}"
+            )
+        builder = getattr(builder, request["part"])
+    timings["setup"] = time.perf_counter() - start
+
+    # NOTE: OCC cannot be interrupted, a build over its budget takes the worker
+    # down with it and the service replaces the pool
+    seconds = [timeout, cf_sandbox.budget_for(builder).wall_seconds]
+    seconds = min((s for s in seconds if s is not None), default=0)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        start = time.perf_counter()
+        # glb keeps the parts and their names apart, the others get one shape
+        glb = request["format"] == "glb"
+        try:
+            if request["for_print"]:
+                built = builder.build_for_print()[1 if glb else 0]
+            elif glb:
+                built = builder.build_assembly()
+            else:
+                built = builder.build()
+        except cf_errors.ConstraintError as ex:
+            # NOTE: the violations refer to constraint lambdas, which do not pickle
+            raise cf_errors.ValueError(str(ex))
+        timings["build"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = cf_export.export_bytes(built, request["format"], request["tolerance"])
+        timings["export"] = time.perf_counter() - start
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return data, timings
+
+
+def normalize_request(payload):
+    if not isinstance(payload, dict):
+        raise cf_errors.ValueError("Request body must be a JSON object")
+
+    request = {
+        "use_case": payload.get("use_case", "default"),
+        "params": payload.get("params", {}),
+        "part": payload.get("part"),
+        "format": str(payload.get("format", "stl")).lower(),
+        "tolerance": payload.get("tolerance", 0.01),
+        "for_print": bool(payload.get("for_print", False)),
+    }
+
+    if not isinstance(request["use_case"], str) or not USE_CASE_PATTERN.match(
+        request["use_case"]
+    ):
+        raise cf_errors.ValueError(f"Invalid use case: {request['use_case']!r}")
+    if not isinstance(request["params"], dict):
+        raise cf_errors.ValueError("params must be a JSON object")
+    if request["part"] is not None and not isinstance(request["part"], str):
+        raise cf_errors.ValueError(f"Invalid part: {request['part']!r}")
+    if request["format"] not in CONTENT_TYPES:
+        raise cf_errors.ValueError(
+            f"Unknown format {request['format']!r}, "
+            f"expected one of {tuple(CONTENT_TYPES)}"
+        )
+    try:
+        request["tolerance"] = float(request["tolerance"])
+    except (TypeError, ValueError) as ex:
+        raise cf_errors.ValueError("tolerance must be a number", ex)
+    # NOTE: NaN passes any comparison and OCC meshes forever with it
+    if not math.isfinite(request["tolerance"]) or request["tolerance"] < MIN_TOLERANCE:
+        raise cf_errors.ValueError(
+            f"tolerance must be a finite number of at least {MIN_TOLERANCE}"
+        )
+
+    return request
+
+
+class BuildService:
+    def __init__(self, workers=None, cache_size=64, timeout=60.0) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        # seconds a request waits for its build, the worker gets as long
+        self.timeout = timeout
+        self.executor = self._new_executor()
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def _new_executor(self):
+        return cf.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_worker
+        )
+
+    def _replace_executor(self, broken):
+        # NOTE: called with the lock held. A worker died (segfault, OOM kill),
+        # the builds in flight on that pool fail with it, later requests go to
+        # a fresh pool.
+        if self.executor is broken:
+            self.executor = self._new_executor()
+            broken.shutdown(wait=False)
+            # start the workers now, not on the next request's clock
+            for _ in range(self.workers):
+                self.executor.submit(_ping)
+
+    def _submit(self, request):
+        executor = self.executor
+        try:
+            return executor, executor.submit(_build, request, self.timeout)
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            return self.executor, self.executor.submit(_build, request, self.timeout)
+
+    def warm(self):
+        pings = [self.executor.submit(_ping) for _ in range(self.workers)]
+        for ping in pings:
+            ping.result()
+
+    def _on_done(self, key, executor, future):
+        with self.lock:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+            if future.cancelled():
+                return
+            exception = future.exception()
+            if isinstance(exception, BrokenProcessPool):
+                self._replace_executor(executor)
+            elif exception is None:
+                self.cache[key] = future.result()
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+    def build(self, request):
+        key = json.dumps(request, sort_keys=True)
+
+        start = time.perf_counter()
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                data, timings = self.cache[key]
+                return data, dict(timings), "hit"
+
+            future = self.in_flight.get(key)
+            if future is None:
+                source = "miss"
+                executor, future = self._submit(request)
+                self.in_flight[key] = future
+            else:
+                source = "coalesced"
+
+        if source == "miss":
+            # outside the lock, the callback of a future that is already done
+            # runs right here and takes the lock itself
+            future.add_done_callback(functools.partial(self._on_done, key, executor))
+
+        try:
+            data, timings = future.result(self.timeout)
+        except cf.TimeoutError:
+            raise cf_errors.TimeoutError(f"Build did not finish within {self.timeout}s")
+        timings = dict(timings)
+        timings["total"] = time.perf_counter() - start
+        timings["queue"] = max(
+            0.0,
+            timings["total"] - timings["setup"] - timings["build"] - timings["export"],
+        )
+        return data, timings, source
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class BuildRequestHandler(http.server.BaseHTTPRequestHandler):
+    service: BuildService = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self.send_json(404, {"error": f"Unknown path {self.path}"})
+        self.send_json(
+            200,
+            {
+                "cached": len(self.service.cache),
+                "in_flight": len(self.service.in_flight),
+            },
+        )
+
+    def do_POST(self):
+        if self.path != "/build":
+            return self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            request = normalize_request(payload)
+        except (json.JSONDecodeError, cf_errors.ValueError) as ex:
+            return self.send_json(400, {"error": str(ex)})
+
+        try:
+            data, timings, source = self.service.build(request)
+        except cf_errors.ValueError as ex:
+            return self.send_json(400, {"error": str(ex), "request": request})
+        except cf_errors.TimeoutError as ex:
+            return self.send_json(504, {"error": str(ex), "request": request})
+        except Exception as ex:
+            return self.send_json(
+                500, {"error": f"{type(ex).__name__}: {ex}", "request": request}
+            )
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[request["format"]])
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Cache", source)
+        self.send_header(
+            "X-Build-Timings",
+            json.dumps({name: round(sec, 6) for name, sec in timings.items()}),
+        )
+        self.send_header(
+            "Server-Timing",
+            ", ".join(f"{name};dur={sec * 1000:.3f}" for name, sec in timings.items()),
+        )
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(host="127.0.0.1", port=8039, workers=None, cache_size=64, timeout=60.0):
+    service = BuildService(workers=workers, cache_size=cache_size, timeout=timeout)
+    service.warm()
+
+    handler = type(
+        "BoundBuildRequestHandler", (BuildRequestHandler,), {"service": service}
+    )
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    print(f"Serving fan builds on http://{host}:{port}/build", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local HTTP build service for FanBuilder graphs"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8039)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.cache_size, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
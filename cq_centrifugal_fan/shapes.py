@@ -1,10 +1,24 @@
+import asyncio
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import hashlib
 import numpy as np
 import os
+import pickle
+import time
 import typing as t
 import math
 
 import cadquery as cq
+from OCP.Bnd import Bnd_Box
 
+import cq_centrifugal_fan.constraints as cf_constraints
+import cq_centrifugal_fan.errors as cf_errors
+import cq_centrifugal_fan.export as cf_export
+import cq_centrifugal_fan.metrics as cf_metrics
+import cq_centrifugal_fan.orientation as cf_orientation
+import cq_centrifugal_fan.transport as cf_transport
 
 
 class MathUtils:
@@ -18,11 +32,290 @@ class MathUtils:
             ]
         )
 
+    @staticmethod
+    def bounding_box(xmin, ymin, zmin, xmax, ymax, zmax):
+        box = Bnd_Box()
+        box.Update(xmin, ymin, zmin, xmax, ymax, zmax)
+        return cq.BoundBox(box)
+
+    @staticmethod
+    def arc_max_radius(start, middle, end):
+        # distance from the origin of the farthest point on the arc through
+        # the three points
+        a, b, c = (np.asarray(p, dtype=np.float64) for p in (start, middle, end))
+        radius = max(np.linalg.norm(a), np.linalg.norm(b), np.linalg.norm(c))
+
+        d = 2 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+        if abs(d) < 1e-12:
+            return radius
+        sa, sb, sc = a @ a, b @ b, c @ c
+        center = np.array(
+            [
+                (sa * (b[1] - c[1]) + sb * (c[1] - a[1]) + sc * (a[1] - b[1])) / d,
+                (sa * (c[0] - b[0]) + sb * (a[0] - c[0]) + sc * (b[0] - a[0])) / d,
+            ]
+        )
+        arc_radius = np.linalg.norm(a - center)
+        center_distance = np.linalg.norm(center)
+        if center_distance < 1e-12:
+            return arc_radius
+
+        def angle(p):
+            return math.atan2(p[1] - center[1], p[0] - center[0])
+
+        far = center + center / center_distance * arc_radius
+        to_middle = (angle(b) - angle(a)) % (2 * math.pi)
+        to_end = (angle(c) - angle(a)) % (2 * math.pi)
+        to_far = (angle(far) - angle(a)) % (2 * math.pi)
+        if to_middle < to_end:
+            on_arc = to_far <= to_end
+        else:
+            on_arc = to_far >= to_end
+        if on_arc:
+            radius = max(radius, center_distance + arc_radius)
+        return radius
+
+
+class Profiles:
+    # 2D profiles are shared between builders and calls, so they are built
+    # from plain values only and returned as faces, never as Workplanes that
+    # could be extended in place.
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def around_base(radius, thickness, overhang, cap, cap_add=0):
+        def rev(x, y=None, z=None):
+            if type(x) == tuple:
+                return rev(*x)
+            if z is not None:
+                return (x, y, z)
+            return (x, y)
+
+        around = (
+            cq.Workplane("XY")
+            .sketch()
+            .circle(radius)
+            .circle(radius - thickness, mode="s", tag="inner")
+            .reset()
+            .push([rev(radius / 2, radius / 2, 0)])
+            .rect(*rev(radius, radius + cap_add), mode="s")
+            .reset()
+            .push(
+                [
+                    rev(
+                        radius / 2 + overhang / 2,
+                        radius / 2,
+                        0,
+                    )
+                ]
+            )
+            .rect(*rev(radius + overhang, radius))
+            .reset()
+            .push(
+                [
+                    rev(
+                        radius / 2 + overhang / 2,
+                        radius / 2 - thickness / 2,
+                        0,
+                    )
+                ]
+            )
+            .rect(
+                *rev(
+                    radius + overhang,
+                    radius - thickness,
+                ),
+                mode="s",
+            )
+        )
+        if not cap:
+            around = (
+                around.reset()
+                .push(
+                    [
+                        rev(
+                            radius + overhang / 2 - thickness / 4,
+                            -thickness / 2,
+                            0,
+                        )
+                    ]
+                )
+                .rect(*rev(overhang + thickness / 2, thickness))
+            )
+        around = around.finalize()
+        base = (
+            cq.Workplane("XY")
+            .sketch()
+            .push(
+                [
+                    rev(
+                        radius / 2 + overhang / 2,
+                        radius / 2,
+                        0,
+                    )
+                ]
+            )
+            .rect(*rev(radius + overhang, radius))
+            .reset()
+            .push([(0, 0, 0)])
+            .circle(radius - thickness, mode="s", tag="inner")
+            .finalize()
+        )
+        return tuple(around.val()), tuple(base.val())
+
+
+class BuildRecord:
+    def __init__(
+        self,
+        name,
+        builder,
+        fingerprint,
+        bounding_box,
+        elapsed,
+        parts=None,
+        offsets=None,
+    ) -> None:
+        self.name = name
+        self.builder = builder
+        self.fingerprint = fingerprint
+        self.bounding_box = bounding_box
+        self.elapsed = elapsed
+        self.parts = parts
+        self.offsets = offsets
+
+    def __repr__(self) -> str:
+        return f"BuildRecord({self.name}, {self.builder}, {self.elapsed:.3f}s)"
+
+    def __getstate__(self):
+        # cq.BoundBox wraps an OCC object that does not pickle
+        state = dict(vars(self))
+        bb = self.bounding_box
+        state["bounding_box"] = (bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax)
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self.bounding_box = MathUtils.bounding_box(*self.bounding_box)
+
+    def to_dict(self):
+        bb = self.bounding_box
+        result = {
+            "name": self.name,
+            "builder": self.builder,
+            "fingerprint": self.fingerprint,
+            "bounding_box": [bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax],
+            "elapsed": self.elapsed,
+        }
+        if self.parts is not None:
+            result["parts"] = {key: part.to_dict() for key, part in self.parts.items()}
+        if self.offsets is not None:
+            result["offsets"] = self.offsets
+        return result
+
+
+def shape_bounding_box(obj):
+    try:
+        return obj.val().BoundingBox()
+    except AttributeError:
+        return obj.BoundingBox()
+
+
+def flipped(built):
+    # upside down for print, rotate() returns a Workplane without the name
+    result = built.rotate((0, 0, 0), (0, 1, 0), 180)
+    name = getattr(built, "name", None)
+    if name is not None:
+        result.name = name
+    return result
+
+
+def has_solid(obj):
+    if isinstance(obj, cq.Shape):
+        return bool(obj.Solids())
+    return any(isinstance(v, cq.Shape) and v.Solids() for v in obj.vals())
+
+
+def validated(build):
+    @functools.wraps(build)
+    def wrapper(self, *args, **kwargs):
+        self.validate()
+        built = build(self, *args, **kwargs)
+        # OCC booleans can fail quietly, what is left is an empty compound
+        if isinstance(built, (cq.Workplane, cq.Shape)) and not has_solid(built):
+            raise cf_errors.ValueError(
+                f"{type(self).__name__} built no solid, the geometry failed "
+                "for these parameters"
+            )
+        return built
+
+    return wrapper
+
+
+_process_executor = None
+
+
+def process_executor():
+    # shared by the async builds of every builder, created on first use
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = concurrent.futures.ProcessPoolExecutor()
+    return _process_executor
+
+
+def _replace_broken(executor):
+    # a worker died (e.g. an OCC segfault), the shared pool is unusable from
+    # then on and the next build gets a fresh one. Pools passed in by the
+    # caller are left to the caller.
+    global _process_executor
+    if executor is _process_executor:
+        _process_executor = None
+        executor.shutdown(wait=False)
+
+
+def _release_abandoned(future):
+    if not future.cancelled() and future.exception() is None:
+        cf_transport.release_result(future.result())
+
 
 class PartBuilder:
+    # None runs async builds on process_executor(). OCC keeps the GIL while it
+    # builds, a thread executor leaves the event loop stalled just the same.
+    executor = None
+    constraints = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # parameters are checked before any OCC work of the subclass
+        if "build" in vars(cls):
+            cls.build = validated(cls.build)
+
     def __init__(self) -> None:
         self.property_router = None
 
+    def violations(self, seen=None):
+        # includes the builders this one depends on, each of them once
+        if seen is None:
+            seen = set()
+        if id(self) in seen:
+            return []
+        seen.add(id(self))
+
+        result = cf_constraints.violations(self, self.constraints)
+        for value in vars(self).values():
+            if isinstance(value, PartBuilder):
+                result += value.violations(seen)
+        return result
+
+    def validate(self):
+        violations = self.violations()
+        if violations:
+            raise cf_errors.ConstraintError(
+                f"Invalid parameters for {type(self).__name__}", violations
+            )
+        return self
+
+    def feasible(self):
+        return cf_constraints.feasible(self.violations())
+
     def build(self):
         raise NotImplementedError("no build method")
 
@@ -31,6 +324,108 @@ class PartBuilder:
             built = self.build()
         return built, [built]
 
+    def build_with_metrics(self, tolerance=0.1, registry=None):
+        if registry is None:
+            registry = cf_metrics.registry
+        start = time.perf_counter()
+        built = self.build()
+        elapsed = time.perf_counter() - start
+        registry.record(
+            type(self).__name__, cf_metrics.shape_metrics(built, tolerance), elapsed
+        )
+        return built
+
+    def coupon_blank(self, parameter, values):
+        raise cf_errors.NotImplementedError(
+            f"{type(self).__name__} has no fit coupon for {parameter}"
+        )
+
+    def coupon_cut(self, parameter, value):
+        raise cf_errors.NotImplementedError(
+            f"{type(self).__name__} has no fit coupon for {parameter}"
+        )
+
+    def analytic_bounding_box(self):
+        # bounding box implied by the parameters alone, None when unknown
+        return None
+
+    def bounding_box(self):
+        box = self.analytic_bounding_box()
+        if box is None:
+            box = shape_bounding_box(self.build())
+        return box
+
+    def build_compact(self):
+        # a bare shape, the Workplane chain and its intermediates are dropped
+        start = time.perf_counter()
+        built = self.build()
+        name = getattr(built, "name", None) or type(self).__name__
+        shape = cf_export.to_shape(built)
+        del built
+
+        box = self.analytic_bounding_box()
+        if box is None:
+            box = shape.BoundingBox()
+        record = BuildRecord(
+            name,
+            type(self).__name__,
+            self.fingerprint(),
+            box,
+            time.perf_counter() - start,
+        )
+        return shape, record
+
+    def build_assembly(self):
+        built = self.build()
+        return cq.Assembly(
+            built, name=getattr(built, "name", None) or type(self).__name__
+        )
+
+    def fingerprint(self):
+        state = (type(self).__module__, type(self).__qualname__, vars(self))
+        return hashlib.sha1(pickle.dumps(state)).hexdigest()
+
+    async def run_async(self, method, *args, executor=None, timeout=None):
+        if executor is None:
+            executor = self.executor or process_executor()
+        if not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                executor, functools.partial(getattr(self, method), *args)
+            )
+            return await asyncio.wait_for(future, timeout)
+
+        # a constraint error is raised here, its violations do not pickle
+        self.validate()
+        # NOTE: a cancel or a timeout only stops a build that is still queued.
+        # One that already runs in a worker goes on to the end, its shapes are
+        # then released unread.
+        try:
+            submitted = cf_transport.submit_build(executor, self, method, *args)
+        except BrokenProcessPool:
+            if executor is not _process_executor:
+                raise
+            _replace_broken(executor)
+            executor = process_executor()
+            submitted = cf_transport.submit_build(executor, self, method, *args)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(submitted), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            submitted.add_done_callback(_release_abandoned)
+            raise
+        except BrokenProcessPool:
+            _replace_broken(executor)
+            raise
+        return cf_transport.load_result(result)
+
+    async def build_async(self, executor=None, timeout=None):
+        return await self.run_async("build", executor=executor, timeout=timeout)
+
+    async def build_for_print_async(self, executor=None, timeout=None):
+        return await self.run_async(
+            "build_for_print", executor=executor, timeout=timeout
+        )
+
     def add_to_side(self, obj, scene, translate_amount=None, extra=None):
         if translate_amount is None:
             try:
@@ -45,13 +440,20 @@ class PartBuilder:
             translate_amount = xmax - obj_bb.xmin
             translate_amount = xmax - obj_bb.xmin
 
-        scene = scene.add(
-            obj.translate((translate_amount + extra if extra else 0, 0, 0))
-        )
+        scene = scene.add(obj.translate((translate_amount + (extra or 0), 0, 0)))
         return scene, translate_amount
 
 
 class PenHolderBuilder(PartBuilder):
+    constraints = [
+        cf_constraints.Constraint("thickness > 0", lambda b: b.thickness > 0),
+        cf_constraints.Constraint("pen_radius > 0", lambda b: b.pen_radius > 0),
+        cf_constraints.Constraint(
+            "pen_connection_length > 0", lambda b: b.pen_connection_length > 0
+        ),
+        cf_constraints.Constraint("slack > -1", lambda b: b.slack > -1),
+    ]
+
     def __init__(self, thickness, pen_radius, pen_connection_length):
         self.thickness = thickness
         self.pen_radius = pen_radius
@@ -67,11 +469,43 @@ class PenHolderBuilder(PartBuilder):
             .workplane()
             .hole(diameter=(self.pen_radius * (1 + self.slack)) * 2)
         )
+        cyl.name = "pen_holder_builder"
 
         return cyl
 
+    def analytic_bounding_box(self):
+        radius = self.pen_radius + self.thickness
+        half_length = self.pen_connection_length / 2
+        return MathUtils.bounding_box(
+            -radius, -radius, -half_length, radius, radius, half_length
+        )
+
+    def coupon_blank(self, parameter, values):
+        if parameter != "slack":
+            return super().coupon_blank(parameter, values)
+        return cq.Workplane("XY").cylinder(
+            height=self.pen_connection_length, radius=self.pen_radius + self.thickness
+        )
+
+    def coupon_cut(self, parameter, value):
+        if parameter != "slack":
+            return super().coupon_cut(parameter, value)
+        return cq.Workplane("XY").cylinder(
+            height=self.pen_connection_length * 2,
+            radius=self.pen_radius * (1 + value),
+        )
+
 
 class FanMotorHolder(PartBuilder):
+    constraints = [
+        cf_constraints.Constraint("motor_radius > 0", lambda b: b.motor_radius > 0),
+        cf_constraints.Constraint("motor_length > 0", lambda b: b.motor_length > 0),
+        cf_constraints.Constraint(
+            "motor_radius * tighten * 1.4 < fcb.fan_hull_radius",
+            lambda b: b.motor_radius * b.tighten * 1.4 < b.fcb.fan_hull_radius,
+        ),
+    ]
+
     def __init__(self, fcb, motor_radius, motor_length):
         self.fcb = fcb
         self.thickness = self.fcb.thickness
@@ -101,26 +535,24 @@ class FanMotorHolder(PartBuilder):
         scene = cq.Workplane("XY")
 
         slack = self.thickness * 0.95
-        self.fcb.fan_hull_radius += slack
+        hull_radius = self.fcb.fan_hull_radius + slack
 
-        around2d, base = self.fcb.get_around_base()
+        around2d, base = self.fcb.get_around_base(radius=hull_radius)
 
         around = around2d.extrude(self.thickness)
-        around2d, _ = self.fcb.get_around_base(cap=True)
+        around2d, _ = self.fcb.get_around_base(cap=True, radius=hull_radius)
         around = around.add(around2d.extrude(-self.thickness * 3))
         base = base.extrude(self.thickness)
 
         fill = (
             cq.Workplane("XY")
             .sketch()
-            .circle(self.fcb.fan_hull_radius)
+            .circle(hull_radius)
             .circle(self.motor_radius * self.tighten, mode="s")
             .finalize()
             .extrude(self.thickness)
         )
 
-        self.fcb.fan_hull_radius -= slack
-
         base_radius = self.motor_radius * self.tighten * 1.4
 
         # md = MathUtils.rotate_around_origin(np.array([0, base_radius]), math.pi/4)
@@ -152,12 +584,56 @@ class FanMotorHolder(PartBuilder):
         return scene
 
     def build_for_print(self):
-        built = self.build()
-        built = built.rotate((0, 0, 0), (0, 1, 0), 180)
-        return super().build_for_print(built)
+        return super().build_for_print(flipped(self.build()))
+
+    def analytic_bounding_box(self):
+        hull_radius = self.fcb.fan_hull_radius + self.thickness * 0.95
+        radius = max(hull_radius, self.motor_radius * self.tighten * 1.4)
+        return MathUtils.bounding_box(
+            -radius,
+            -radius,
+            -self.thickness * 3,
+            max(hull_radius + self.fcb.outward_overhang, radius),
+            radius,
+            max(self.thickness, self.motor_length),
+        )
+
+    def coupon_blank(self, parameter, values):
+        # a short slice of the motor sleeve, sized for the loosest variant
+        if parameter != "tighten":
+            return super().coupon_blank(parameter, values)
+        return (
+            cq.Workplane("XY")
+            .circle(self.motor_radius * max(values) * 1.4)
+            .extrude(self.motor_length / 4)
+        )
+
+    def coupon_cut(self, parameter, value):
+        if parameter != "tighten":
+            return super().coupon_cut(parameter, value)
+        return (
+            cq.Workplane("XY")
+            .circle(self.motor_radius * value)
+            .extrude(self.motor_length)
+            .translate((0, 0, -self.motor_length / 2))
+        )
 
 
 class FanCompartmentBuilder(PartBuilder):
+    constraints = [
+        cf_constraints.Constraint("thickness > 0", lambda b: b.thickness > 0),
+        cf_constraints.Constraint(
+            "fan_hull_radius > 2 * thickness",
+            lambda b: b.fan_hull_radius > 2 * b.thickness,
+        ),
+        cf_constraints.Constraint(
+            "fan_hull_length > 0", lambda b: b.fan_hull_length > 0
+        ),
+        cf_constraints.Constraint(
+            "outward_overhang >= 0", lambda b: b.outward_overhang >= 0
+        ),
+    ]
+
     def __init__(
         self,
         fan_hull_radius,
@@ -172,97 +648,31 @@ class FanCompartmentBuilder(PartBuilder):
         self.outward_overhang = outward_overhang
         self.hotfix_length = hotfix_length
 
-    def get_around_base(self, cap=False):
-        def rev(x, y=None, z=None):
-            if type(x) == tuple:
-                return rev(*x)
-            if z is not None:
-                return (x, y, z)
-            return (x, y)
-
+    def get_around_base(self, cap=False, radius=None):
+        if radius is None:
+            radius = self.fan_hull_radius
+        # the cap clearance follows the full thickness, even under hotfix_length
         cap_add = 0 if not cap else self.thickness * 2.0
-
-        if self.hotfix_length:
-            self.thickness /= 2
-        around = (
-            cq.Workplane("XY")
-            .sketch()
-            .circle(self.fan_hull_radius)
-            .circle(self.fan_hull_radius - self.thickness, mode="s", tag="inner")
-            .reset()
-            .push([rev(self.fan_hull_radius / 2, self.fan_hull_radius / 2, 0)])
-            .rect(*rev(self.fan_hull_radius, self.fan_hull_radius + cap_add), mode="s")
-            .reset()
-            .push(
-                [
-                    rev(
-                        self.fan_hull_radius / 2 + self.outward_overhang / 2,
-                        self.fan_hull_radius / 2,
-                        0,
-                    )
-                ]
-            )
-            .rect(
-                *rev(self.fan_hull_radius + self.outward_overhang, self.fan_hull_radius)
-            )
-            .reset()
-            .push(
-                [
-                    rev(
-                        self.fan_hull_radius / 2 + self.outward_overhang / 2,
-                        self.fan_hull_radius / 2 - self.thickness / 2,
-                        0,
-                    )
-                ]
-            )
-            .rect(
-                *rev(
-                    self.fan_hull_radius + self.outward_overhang,
-                    self.fan_hull_radius - self.thickness,
-                ),
-                mode="s",
-            )
+        thickness = self.thickness / 2 if self.hotfix_length else self.thickness
+        around, base = Profiles.around_base(
+            radius, thickness, self.outward_overhang, cap, cap_add
         )
-        if not cap:
-            around = (
-                around.reset()
-                .push(
-                    [
-                        rev(
-                            self.fan_hull_radius
-                            + self.outward_overhang / 2
-                            - self.thickness / 4,
-                            -self.thickness / 2,
-                            0,
-                        )
-                    ]
-                )
-                .rect(*rev(self.outward_overhang + self.thickness / 2, self.thickness))
-            )
-        around = around.finalize()
-        base = (
-            cq.Workplane("XY")
-            .sketch()
-            .push(
-                [
-                    rev(
-                        self.fan_hull_radius / 2 + self.outward_overhang / 2,
-                        self.fan_hull_radius / 2,
-                        0,
-                    )
-                ]
-            )
-            .rect(
-                *rev(self.fan_hull_radius + self.outward_overhang, self.fan_hull_radius)
-            )
-            .reset()
-            .push([(0, 0, 0)])
-            .circle(self.fan_hull_radius - self.thickness, mode="s", tag="inner")
-            .finalize()
+        return cq.Workplane("XY").add(list(around)), cq.Workplane("XY").add(list(base))
+
+    def hull_length(self):
+        addition = 0 if not self.hotfix_length else 3.5 * self.thickness
+        return self.fan_hull_length + addition
+
+    def analytic_bounding_box(self):
+        radius = self.fan_hull_radius
+        return MathUtils.bounding_box(
+            -radius,
+            -radius,
+            0,
+            radius + self.outward_overhang,
+            radius,
+            max(self.hull_length(), self.thickness),
         )
-        if self.hotfix_length:
-            self.thickness *= 2
-        return around, base
 
     def build_with_sketch(self):
         scene = cq.Workplane("XY")
@@ -288,12 +698,28 @@ class FanCompartmentBuilder(PartBuilder):
         return result
 
     def build_for_print(self):
-        built = self.build()
-        built = built.rotate((0, 0, 0), (0, 1, 0), 180)
-        return super().build_for_print(built)
+        return super().build_for_print(flipped(self.build()))
 
 
 class CentrifugeBuilder(PartBuilder):
+    holder_length = 6
+    constraints = [
+        cf_constraints.Constraint("inside_slack >= 0", lambda b: b.inside_slack >= 0),
+        cf_constraints.Constraint(
+            "inner_ring_radius > 0", lambda b: b.inner_ring_radius > 0
+        ),
+        cf_constraints.Constraint(
+            "inner_ring_radius < fan_radius",
+            lambda b: b.inner_ring_radius < b.fan_radius,
+        ),
+        cf_constraints.Constraint("fan_height > 0", lambda b: b.fan_height > 0),
+        cf_constraints.Constraint("top_height > 0", lambda b: b.top_height > 0),
+        cf_constraints.Constraint(
+            "holder_thickness < fan_radius",
+            lambda b: b.holder_thickness is None or b.holder_thickness < b.fan_radius,
+        ),
+    ]
+
     def __init__(
         self,
         fcb: FanCompartmentBuilder,
@@ -343,7 +769,8 @@ class CentrifugeBuilder(PartBuilder):
         return result
 
     def build_for_print(self):
-        return
+        # blades up, as built
+        return super().build_for_print()
 
     def build_top(self):
         scene = cq.Workplane("XY")
@@ -359,13 +786,13 @@ class CentrifugeBuilder(PartBuilder):
             self.holder_thickness = self.fcb.thickness * 2
 
         scene.add(
-            Z1MotorJoint.no_screw(self.holder_thickness, 6)
+            Z1MotorJoint.no_screw(self.holder_thickness, self.holder_length)
             .build()
             .translate((0, 0, self.fan_height))
         )
         return scene
 
-    def build_fan_and_bottom(self):
+    def blade_points(self):
         initial_start = blade_end = np.array([0, self.fan_radius])
         # print(f"{blade_end=}, {self.blade_angle=}")
         blade_end = MathUtils.rotate_around_origin(blade_end, self.blade_angle)
@@ -396,6 +823,23 @@ class CentrifugeBuilder(PartBuilder):
         # right_start = right_arc_midpoint/np.linalg.norm(right_arc_midpoint) * self.inner_ring_radius
         right_start = left_start
 
+        return (
+            left_start,
+            left_arc_midpoint,
+            blade_end,
+            right_arc_midpoint,
+            right_start,
+        )
+
+    def build_blade(self):
+        (
+            left_start,
+            left_arc_midpoint,
+            blade_end,
+            right_arc_midpoint,
+            right_start,
+        ) = self.blade_points()
+
         blade = (
             cq.Workplane("XY")
             .moveTo(left_start[0], left_start[1])
@@ -407,15 +851,34 @@ class CentrifugeBuilder(PartBuilder):
             # .circle(self.inner_ring_radius)
             .extrude(self.fan_height)
         )
+        return blade
 
-        scene = cq.Workplane("XY")
+    def analytic_bounding_box(self):
+        left_start, left_middle, blade_end, right_middle, right_start = (
+            self.blade_points()
+        )
+        holder_thickness = self.holder_thickness
+        if holder_thickness is None:
+            holder_thickness = self.fcb.thickness * 2
+
+        # NOTE: the blades can reach past fan_radius, the box then contains
+        # the part without being tight in X and Y
+        radius = max(
+            self.fan_radius,
+            holder_thickness,
+            MathUtils.arc_max_radius(left_start, left_middle, blade_end),
+            MathUtils.arc_max_radius(blade_end, right_middle, right_start),
+        )
+        top = self.fan_height + max(self.top_height, self.holder_length)
+        return MathUtils.bounding_box(
+            -radius, -radius, 0, radius, radius, max(top, self.base_height)
+        )
 
-        for i in range(self.num_blades):
-            scene = scene.add(
-                blade.rotate((0, 0, 0), (0, 0, 1), i * 360 / self.num_blades)
-            )
+    def blade_angles(self):
+        return [i * 360 / self.num_blades for i in range(self.num_blades)]
 
-        scene = scene.union(
+    def build_bottom(self):
+        return (
             cq.Workplane("XY")
             .sketch()
             .circle(self.fan_radius)
@@ -424,14 +887,65 @@ class CentrifugeBuilder(PartBuilder):
             .extrude(self.base_height)
         )
 
+    def build_fan_and_bottom(self):
+        blade = self.build_blade().val()
+
+        # one Workplane for all the blades instead of a chain of eight
+        scene = cq.Workplane("XY").add(
+            [blade.rotate((0, 0, 0), (0, 0, 1), angle) for angle in self.blade_angles()]
+        )
+
+        scene = scene.union(self.build_bottom())
+
         return scene
 
+    def build_assembly(self):
+        assy = cq.Assembly(name="centrifuge_builder")
+
+        # one blade shape, placed once per blade
+        blade = self.build_blade().val()
+        for i, angle in enumerate(self.blade_angles()):
+            assy.add(
+                blade,
+                name=f"blade_{i}",
+                loc=cq.Location(cq.Vector(0, 0, 0), cq.Vector(0, 0, 1), angle),
+            )
+        assy.add(self.build_bottom(), name="bottom")
+        assy.add(self.build_top(), name="top")
+
+        return assy
+
 
 class ConnectorBuilder(PartBuilder):
     pass
 
 
 class JointBuilder(PartBuilder):
+    constraints = [
+        cf_constraints.Constraint("diameter > 0", lambda b: b.diameter > 0),
+        cf_constraints.Constraint("thickness > 0", lambda b: b.thickness > 0),
+        cf_constraints.Constraint("num_screws >= 0", lambda b: b.num_screws >= 0),
+        cf_constraints.Constraint(
+            "screw_inner < nut_side",
+            lambda b: (b.num_screws == 0) | (b.screw_inner < b.nut_side),
+        ),
+        # the nut pockets have to stay inside the joint
+        cf_constraints.Constraint(
+            "nut_side <= from_outside < diameter",
+            lambda b: (b.num_screws == 0)
+            | ((b.nut_side <= b.from_outside) & (b.from_outside < b.diameter)),
+        ),
+        cf_constraints.Constraint(
+            "nut pockets do not overlap",
+            lambda b: (b.num_screws < 2)
+            | (
+                (b.diameter - b.from_outside)
+                * np.sin(np.pi / np.maximum(b.num_screws, 1))
+                > b.nut_side
+            ),
+        ),
+    ]
+
     def __init__(
         self,
         diameter,
@@ -453,13 +967,12 @@ class JointBuilder(PartBuilder):
         self.is_socket = is_socket
         self.decrease_ratio = decrease_ratio
         self.from_outside = from_outside
-
-        self.screw_center = np.array(
-            [0, self.diameter - self.from_outside],
-            dtype=np.float32,
-        )
         # self.decrease = self.screw_outer * (self.decrease_ratio if not self.is_socket else 0)
 
+    @property
+    def screw_center(self):
+        return np.array([0, self.diameter - self.from_outside], dtype=np.float32)
+
     @classmethod
     def m3_5(cls):
         return cls(
@@ -526,6 +1039,39 @@ class JointBuilder(PartBuilder):
 
         return scene
 
+    def screw_angles(self):
+        return [i * 360 / self.num_screws for i in range(self.num_screws)]
+
+    def build_connection(self):
+        screw_center = (self.screw_center[0], self.screw_center[1], 0.0)
+        sgn = -1  # if self.is_socket else 1
+        return (
+            cq.Workplane("XY")
+            .sketch()
+            .push([screw_center])
+            .regularPolygon(self.nut_side, 6)
+            .reset()
+            .push([screw_center])
+            .circle(self.screw_inner, mode="s")
+            .finalize()
+            .extrude(self.thickness + sgn * self.thickness / 2.3)
+        )
+
+    def build_assembly(self):
+        assy = cq.Assembly(self.build_base(), name=type(self).__name__)
+
+        # the screw pockets are copies of one shape rotated around Z
+        if self.num_screws:
+            connection = self.build_connection().val()
+            for i, angle in enumerate(self.screw_angles()):
+                assy.add(
+                    connection,
+                    name=f"connection_{i}",
+                    loc=cq.Location(cq.Vector(0, 0, 0), cq.Vector(0, 0, 1), angle),
+                )
+
+        return assy
+
 
 class Z1MotorJoint(JointBuilder):
     def __init__(self, *args, **kwargs):
@@ -552,6 +1098,9 @@ class Z1MotorJoint(JointBuilder):
 
 
 class FanBuilder(PartBuilder):
+    # the sub-builders, in stacking order
+    PARTS = ("phb", "cb", "fcb", "cent_b", "fmh")
+
     def __init__(
         self,
         phb: PenHolderBuilder,
@@ -589,32 +1138,236 @@ class FanBuilder(PartBuilder):
         scene = scene.add(obj.translate((0, 0, translate_amount)))
         return scene, translate_amount
 
-    def build(self):
+    def offsets(self, boxes):
+        # same stacking as add_to_top, computed from one bounding box per part
+        offsets = {}
+        top = 0
+        for key in self.PARTS:
+            if key == "cent_b":
+                offsets[key] = offsets["fcb"]
+            else:
+                offsets[key] = top - boxes[key].zmin
+            top = max(top, boxes[key].zmax + offsets[key])
+        return offsets
+
+    def place(self, phb, cb, fcb, cent_b, fmh, boxes=None):
+        parts = {"phb": phb, "cb": cb, "fcb": fcb, "cent_b": cent_b, "fmh": fmh}
+        if boxes is None:
+            boxes = {key: shape_bounding_box(part) for key, part in parts.items()}
+        offsets = self.offsets(boxes)
+
         scene = cq.Workplane("XY")
+        for key, part in parts.items():
+            scene = scene.add(part.translate((0, 0, offsets[key])))
+
+        return scene, offsets
+
+    def assemble(self, phb, cb, fcb, cent_b, fmh, boxes=None):
+        return self.place(phb, cb, fcb, cent_b, fmh, boxes)[0]
+
+    def build_assembly(self, name="fan"):
+        assemblies = {
+            "phb": self.phb.build_assembly(),
+            "cb": self.cb.build_assembly(),
+            "fcb": self.fcb.build_assembly(),
+            "cent_b": self.cent_b.build_assembly(),
+            "fmh": self.fmh.build_assembly(),
+        }
+        offsets = self.offsets(
+            {key: sub.toCompound().BoundingBox() for key, sub in assemblies.items()}
+        )
+
+        assy = cq.Assembly(name=name)
+        for key, sub in assemblies.items():
+            assy.add(sub, name=key, loc=cq.Location(cq.Vector(0, 0, offsets[key])))
+        return assy
+
+    @staticmethod
+    def layout_assembly(fan_assembly, locations, name="layout"):
+        # every fan refers to the same shapes, only the locations differ
+        layout = cq.Assembly(name=name)
+        for i, loc in enumerate(locations):
+            if not isinstance(loc, cq.Location):
+                loc = cq.Location(cq.Vector(*loc))
+            layout.add(fan_assembly, name=f"{fan_assembly.name}_{i}", loc=loc)
+        return layout
+
+    def build_lazy(self):
+        return LazyScene(self)
 
-        self.add_to_top(self.phb.build(), scene)
-        self.add_to_top(self.cb.build(), scene)
-        _, fcb_trans = self.add_to_top(self.fcb.build(), scene)
+    def build_parts(self):
+        return {key: getattr(self, key).build() for key in self.PARTS}
 
-        self.add_to_top(self.cent_b.build(), scene, fcb_trans)
-        self.add_to_top(self.fmh.build(), scene)
+    def build(self):
+        return self.assemble(**self.build_parts())
 
+    def build_compact(self):
+        start = time.perf_counter()
+        compact = {key: getattr(self, key).build_compact() for key in self.PARTS}
+        records = {key: record for key, (_, record) in compact.items()}
+        boxes = {key: record.bounding_box for key, record in records.items()}
+        offsets = self.offsets(boxes)
+
+        shapes = [
+            shape.translate((0, 0, offsets[key])) for key, (shape, _) in compact.items()
+        ]
+        box = MathUtils.bounding_box(
+            min(b.xmin for b in boxes.values()),
+            min(b.ymin for b in boxes.values()),
+            min(b.zmin + offsets[key] for key, b in boxes.items()),
+            max(b.xmax for b in boxes.values()),
+            max(b.ymax for b in boxes.values()),
+            max(b.zmax + offsets[key] for key, b in boxes.items()),
+        )
+        record = BuildRecord(
+            "fan",
+            type(self).__name__,
+            self.fingerprint(),
+            box,
+            time.perf_counter() - start,
+            parts=records,
+            offsets=offsets,
+        )
+        return cq.Compound.makeCompound(shapes), record
+
+    def build_with_metrics(self, tolerance=0.1, registry=None):
+        if registry is None:
+            registry = cf_metrics.registry
+        start = time.perf_counter()
+        parts = [
+            builder.build_with_metrics(tolerance, registry)
+            for builder in (getattr(self, key) for key in self.PARTS)
+        ]
+        scene = self.assemble(*parts)
+        elapsed = time.perf_counter() - start
+        registry.record(
+            type(self).__name__, cf_metrics.shape_metrics(scene, tolerance), elapsed
+        )
         return scene
 
-    def build_for_print(self):
+    def layout_for_print(self, built_for_print, orient=False, model=None, spacing=2):
         parts = []
-
-        component_builders = [self.phb, self.cb, self.fcb, self.cent_b]
-        for builder in component_builders:
-            for part in builder.build_for_print()[1]:
+        for _, builder_parts in built_for_print:
+            for part in builder_parts:
+                if orient:
+                    part = cf_orientation.orient(part, model)[0]
                 parts.append(part)
 
         full_scene = cq.Workplane("XY")
         for part in parts:
-            full_scene = self.add_to_side(part, full_scene)[0]
+            full_scene = self.add_to_side(part, full_scene, extra=spacing)[0]
 
         return full_scene, parts
 
+    def build_for_print(self, orient=False, model=None):
+        component_builders = [self.phb, self.cb, self.fcb, self.cent_b]
+        return self.layout_for_print(
+            [builder.build_for_print() for builder in component_builders],
+            orient,
+            model,
+        )
+
+    async def run_all_async(self, builders, method, executor=None):
+        return await asyncio.gather(
+            *(b.run_async(method, executor=executor) for b in builders)
+        )
+
+    async def build_async(self, executor=None, timeout=None):
+        if type(self).build is not FanBuilder.build:
+            return await super().build_async(executor, timeout)
+
+        async def build():
+            parts = await self.run_all_async(
+                [getattr(self, key) for key in self.PARTS],
+                "build",
+                executor,
+            )
+            return self.assemble(*parts)
+
+        return await asyncio.wait_for(build(), timeout)
+
+    async def build_for_print_async(self, executor=None, timeout=None):
+        if type(self).build_for_print is not FanBuilder.build_for_print:
+            return await super().build_for_print_async(executor, timeout)
+
+        async def build_for_print():
+            built_for_print = await self.run_all_async(
+                [self.phb, self.cb, self.fcb, self.cent_b],
+                "build_for_print",
+                executor,
+            )
+            return self.layout_for_print(built_for_print)
+
+        return await asyncio.wait_for(build_for_print(), timeout)
+
+
+class LazyPart:
+    def __init__(self, builder: PartBuilder) -> None:
+        self.builder = builder
+        self._built = None
+
+    @property
+    def is_built(self):
+        return self._built is not None
+
+    @property
+    def built(self):
+        if self._built is None:
+            self._built = self.builder.build()
+        return self._built
+
+    def bounding_box(self):
+        if self._built is not None:
+            return shape_bounding_box(self._built)
+        return self.builder.bounding_box()
+
+    def __getattr__(self, name):
+        # any other attribute is geometry access on the built Workplane
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.built, name)
+
+
+class LazyScene:
+    def __init__(self, fan_builder) -> None:
+        self.fan_builder = fan_builder
+        self.parts = {
+            key: LazyPart(getattr(fan_builder, key)) for key in fan_builder.PARTS
+        }
+        self._boxes = None
+        self._offsets = None
+
+    def __getitem__(self, key):
+        return self.parts[key]
+
+    def __iter__(self):
+        return iter(self.parts)
+
+    def bounding_boxes(self):
+        if self._boxes is None:
+            self._boxes = {key: part.bounding_box() for key, part in self.parts.items()}
+        return self._boxes
+
+    def offsets(self):
+        if self._offsets is None:
+            self._offsets = self.fan_builder.offsets(self.bounding_boxes())
+        return self._offsets
+
+    def placed_bounding_box(self, key):
+        box, offset = self.bounding_boxes()[key], self.offsets()[key]
+        return MathUtils.bounding_box(
+            box.xmin, box.ymin, box.zmin + offset, box.xmax, box.ymax, box.zmax + offset
+        )
+
+    def placed(self, key):
+        return self.parts[key].built.translate((0, 0, self.offsets()[key]))
+
+    def build(self):
+        return self.fan_builder.assemble(
+            **{key: part.built for key, part in self.parts.items()},
+            boxes=self.bounding_boxes(),
+        )
+
 
 class TestFanBuilder(FanBuilder):
     def build_for_print(self, only_build=None):
@@ -692,6 +1445,17 @@ class TestFanBuilder(FanBuilder):
 
 
 class SplineConnectorBuilder(ConnectorBuilder):
+    constraints = [
+        cf_constraints.Constraint(
+            "connector_length > 0", lambda b: b.connector_length > 0
+        ),
+        cf_constraints.Constraint(
+            "phb outer radius < fcb inner radius",
+            lambda b: b.phb.pen_radius + b.phb.thickness
+            < b.fcb.fan_hull_radius - b.fcb.thickness,
+        ),
+    ]
+
     def __init__(
         self, phb: PenHolderBuilder, fcb: FanCompartmentBuilder, connector_length
     ) -> None:
@@ -700,6 +1464,12 @@ class SplineConnectorBuilder(ConnectorBuilder):
         self.phb = phb
         self.fcb = fcb
 
+    def analytic_bounding_box(self):
+        radius = self.fcb.fan_hull_radius - self.fcb.thickness + self.phb.thickness
+        return MathUtils.bounding_box(
+            -radius, -radius, 0, radius, radius, self.connector_length
+        )
+
     def build(self):
         points = []
         points.append((0, 0))
@@ -747,7 +1517,9 @@ class SplineConnectorBuilder(ConnectorBuilder):
             .rotate(axisStartPoint=(0, 0, 0), axisEndPoint=(0, 0, 1), angleDegrees=0)
         )
 
-        return half.union(other_half)
+        result = half.union(other_half)
+        result.name = "spline_connector_builder"
+        return result
 
         # # p = scene.spline(points, forConstruction=True).toPending().wire().toPending()
         # p = scene.lineTo(points[0][0], points[0][1])
@@ -773,8 +1545,7 @@ class SplineConnectorBuilder(ConnectorBuilder):
         return scene
 
     def build_for_print(self):
-        built = self.build()
-        built = built.rotate((0, 0, 0), (0, 1, 0), 180)
+        built = flipped(self.build())
         return built, [built]
 
 
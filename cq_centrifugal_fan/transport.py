@@ -0,0 +1,120 @@
+import io
+from multiprocessing import resource_tracker, shared_memory
+
+import cadquery as cq
+
+import cq_centrifugal_fan.export as cf_export
+
+
+class ShapeHandle:
+    # a BREP in a shared memory segment, only the name crosses process
+    # boundaries. The segment is unlinked once the shape is loaded, or by
+    # release() for handles that are never loaded.
+    def __init__(self, segment, size, name=None) -> None:
+        self.segment = segment
+        self.size = size
+        self.name = name
+        self._shape = None
+
+    def __getstate__(self):
+        state = dict(vars(self))
+        state["_shape"] = None
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        # the receiving process owns the segment, its resource tracker removes
+        # it at exit if nobody loads or releases it
+        resource_tracker.register("/" + self.segment, "shared_memory")
+
+    def __repr__(self) -> str:
+        return f"ShapeHandle({self.segment}, {self.size} bytes, name={self.name})"
+
+    @property
+    def is_loaded(self):
+        return self._shape is not None
+
+    def read(self, unlink=False):
+        shm = shared_memory.SharedMemory(self.segment)
+        try:
+            return bytes(shm.buf[: self.size])
+        finally:
+            shm.close()
+            if unlink:
+                shm.unlink()
+
+    def release(self):
+        try:
+            shm = shared_memory.SharedMemory(self.segment)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
+
+    @property
+    def shape(self):
+        if self._shape is None:
+            self._shape = cq.Shape.importBrep(io.BytesIO(self.read(unlink=True)))
+        return self._shape
+
+    def workplane(self):
+        result = cq.Workplane("XY").add(self.shape)
+        if self.name is not None:
+            result.name = self.name
+        return result
+
+
+def share(obj):
+    data = cf_export.brep_bytes(obj)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    # NOTE: handed over to whoever receives the handle, a worker exiting must
+    # not take the segment with it
+    resource_tracker.unregister(shm._name, "shared_memory")
+    try:
+        shm.buf[: len(data)] = data
+        return ShapeHandle(shm.name, len(data), getattr(obj, "name", None))
+    finally:
+        shm.close()
+
+
+def share_result(result):
+    # handles in place of every shape in a (nested) build result
+    if isinstance(result, (cq.Workplane, cq.Shape)):
+        return share(result)
+    if isinstance(result, (list, tuple)):
+        return type(result)(share_result(item) for item in result)
+    if isinstance(result, dict):
+        return {key: share_result(value) for key, value in result.items()}
+    return result
+
+
+def load_result(result):
+    # the inverse of share_result, in the process that received the handles
+    if isinstance(result, ShapeHandle):
+        return result.workplane()
+    if isinstance(result, (list, tuple)):
+        return type(result)(load_result(item) for item in result)
+    if isinstance(result, dict):
+        return {key: load_result(value) for key, value in result.items()}
+    return result
+
+
+def release_result(result):
+    # for results nobody is going to load, e.g. of a cancelled build
+    if isinstance(result, ShapeHandle):
+        result.release()
+    elif isinstance(result, (list, tuple)):
+        for item in result:
+            release_result(item)
+    elif isinstance(result, dict):
+        for value in result.values():
+            release_result(value)
+
+
+def build_shared(builder, method="build", *args):
+    # runs in the worker, what comes back is small and cheap to pickle
+    return share_result(getattr(builder, method)(*args))
+
+
+def submit_build(executor, builder, method="build", *args):
+    return executor.submit(build_shared, builder, method, *args)
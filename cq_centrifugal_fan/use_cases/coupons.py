@@ -0,0 +1,21 @@
+import cq_centrifugal_fan.coupons as cf_coupons
+import cq_centrifugal_fan.debug as cf_debug
+from cq_centrifugal_fan.use_cases.default import make_fan_builder
+
+
+def main():
+    fb = make_fan_builder()
+
+    plate, _ = cf_coupons.coupon_batch(
+        fb.fmh, "tighten", [0.98 + i / 100 for i in range(10)]
+    )
+    cf_debug.monitor.show_object(plate, clear=True)
+
+    plate, _ = cf_coupons.coupon_batch(
+        fb.phb, "slack", [-0.02 + i / 100 for i in range(6)]
+    )
+    cf_debug.monitor.show_object(plate.translate((0, 60, 0)))
+
+
+if __name__ == "__main__":
+    main()
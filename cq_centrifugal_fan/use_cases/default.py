@@ -17,36 +17,44 @@ class Z1MotorMeasurements:
     LENGTH = 16.0
 
 
-def main():
-    PM = PenMeasurements
-    Z1 = Z1MotorMeasurements
-
+def make_fan_builder(
+    pen_outer_radius=PenMeasurements.OUTER_RADIUS,
+    pen_thickness=PenMeasurements.THICKNESS,
+    motor_diameter=Z1MotorMeasurements.DIAMETER,
+    motor_length=Z1MotorMeasurements.LENGTH,
+):
     phb = cf_shapes.PenHolderBuilder(
-        PM.THICKNESS * 2, PM.OUTER_RADIUS / 2, PM.OUTER_RADIUS * 3 / 4
+        pen_thickness * 2, pen_outer_radius / 2, pen_outer_radius * 3 / 4
     )
     fcb = cf_shapes.FanCompartmentBuilder(
-        PM.OUTER_RADIUS * 1.2 - phb.thickness,
-        PM.OUTER_RADIUS * 3,
+        pen_outer_radius * 1.2 - phb.thickness,
+        pen_outer_radius * 3,
         phb.thickness,
         phb.pen_radius * 3 / 4,
     )
-    fmh = cf_shapes.FanMotorHolder(fcb, Z1.DIAMETER / 2, Z1.LENGTH)
-    cb = cf_shapes.SplineConnectorBuilder(phb, fcb, PM.OUTER_RADIUS * 1)
+    fmh = cf_shapes.FanMotorHolder(fcb, motor_diameter / 2, motor_length)
+    cb = cf_shapes.SplineConnectorBuilder(phb, fcb, pen_outer_radius * 1)
 
     cent_b = cf_shapes.CentrifugeBuilder(
         fcb,
         phb.thickness * 1.2,
-        PM.OUTER_RADIUS / 2,
+        pen_outer_radius / 2,
         math.pi / 3.5,
         fan_length_offset=fcb.thickness * 3,
-        holder_thickness=Z1.DIAMETER / 2 * 0.7,
+        holder_thickness=motor_diameter / 2 * 0.7,
     )
 
-    cf_debug.monitor.show_object(phb.build().translate((0, 0, 0)), clear=True)
-    cf_debug.monitor.show_object(cb.build().translate((0, 0, 20)))
-    cf_debug.monitor.show_object(fcb.build().translate((0, 0, 40)))
-    cf_debug.monitor.show_object(cent_b.build().translate((0, 0, 70)))
-    cf_debug.monitor.show_object(fmh.build().translate((0, 0, 100)))
+    return cf_shapes.FanBuilder(phb, fcb, cb, cent_b, fmh)
+
+
+def main():
+    fb = make_fan_builder()
+
+    cf_debug.monitor.show_object(fb.phb.build().translate((0, 0, 0)), clear=True)
+    cf_debug.monitor.show_object(fb.cb.build().translate((0, 0, 20)))
+    cf_debug.monitor.show_object(fb.fcb.build().translate((0, 0, 40)))
+    cf_debug.monitor.show_object(fb.cent_b.build().translate((0, 0, 70)))
+    cf_debug.monitor.show_object(fb.fmh.build().translate((0, 0, 100)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+
+import cq_centrifugal_fan.debug as cf_debug
+import cq_centrifugal_fan.shapes as cf_shapes
+
+# modules that define geometry, a change invalidates every built part
+CODE_MODULES = ("cq_centrifugal_fan.shapes",)
+
+
+def log(message):
+    print(f"[watch] {message}", file=sys.stderr)
+
+
+class Watcher:
+    def __init__(self, use_case="default", param_files=(), monitor=None) -> None:
+        self.use_case_module = "cq_centrifugal_fan.use_cases." + use_case
+        self.param_files = [os.path.abspath(path) for path in param_files]
+        self.monitor = monitor if monitor is not None else cf_debug.monitor
+        self.mtimes = {}
+        self.built = {}
+
+    def module_files(self):
+        files = {}
+        for name in CODE_MODULES + (self.use_case_module,):
+            module = importlib.import_module(name)
+            files[os.path.abspath(module.__file__)] = name
+        return files
+
+    def poll(self):
+        changed = []
+        for path in list(self.module_files()) + self.param_files:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self.mtimes.get(path) != mtime:
+                changed.append(path)
+                self.mtimes[path] = mtime
+        return changed
+
+    def reload(self, changed):
+        module_files = self.module_files()
+        for path in changed:
+            name = module_files.get(path)
+            if name is None:
+                continue
+            importlib.reload(sys.modules[name])
+            log(f"reloaded {name}")
+            if name in CODE_MODULES:
+                self.built.clear()
+            # fingerprints cover builder state, not code
+            for key, cached in list(self.built.items()):
+                if cached[0] == name:
+                    del self.built[key]
+
+    def load_params(self):
+        params = {}
+        for path in self.param_files:
+            with open(path) as f:
+                params.update(json.load(f))
+        return params
+
+    def rebuild(self):
+        module = sys.modules[self.use_case_module]
+        fan_builder = module.make_fan_builder(**self.load_params())
+
+        parts = {}
+        boxes = {}
+        for key in fan_builder.PARTS:
+            builder = getattr(fan_builder, key)
+            fingerprint = builder.fingerprint()
+            cached = self.built.get(key)
+            if cached is None or cached[1] != fingerprint:
+                start = time.perf_counter()
+                built = builder.build()
+                cached = (
+                    type(builder).__module__,
+                    fingerprint,
+                    built,
+                    cf_shapes.shape_bounding_box(built),
+                )
+                self.built[key] = cached
+                log(f"rebuilt {key} in {time.perf_counter() - start:.3f}s")
+            _, _, parts[key], boxes[key] = cached
+
+        return fan_builder.assemble(**parts, boxes=boxes)
+
+    def step(self, first=False):
+        changed = self.poll()
+        if not changed:
+            return False
+
+        try:
+            if not first:
+                self.reload(changed)
+            scene = self.rebuild()
+            self.monitor.show_object(scene, clear=True)
+        except Exception:
+            log("update failed, keeping the previous view")
+            traceback.print_exc()
+        return True
+
+    def run(self, interval=0.5):
+        self.step(first=True)
+        log("watching " + ", ".join(sorted(self.mtimes)))
+        try:
+            while True:
+                time.sleep(interval)
+                self.step()
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild and show the fan whenever its sources change"
+    )
+    parser.add_argument("--use-case", default="default")
+    parser.add_argument(
+        "--params",
+        action="append",
+        default=[],
+        help="JSON file with make_fan_builder keyword arguments, can be repeated",
+    )
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    Watcher(args.use_case, args.params).run(args.interval)
+
+
+if __name__ == "__main__":
+    main()